@@ -0,0 +1,279 @@
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+from decouple import config
+from sqlalchemy import BigInteger, case, cast, func, select
+import csv
+import io
+import numpy as np
+
+from app.core.database import databases
+from app.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+# Rows fetched from the database cursor per chunk
+CHUNK_SIZE = config('ANALYTICS_CHUNK_SIZE', default=50000, cast=int)
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+DELIVERY_TYPES = ["pickup", "delivery"]
+
+REPORTS = ("summary", "heatmap", "moving_average", "top_items", "basket")
+
+LIVE_TABLES = (Order, OrderItem)
+ARCHIVE_TABLES = (ArchivedOrder, ArchivedOrderItem)
+
+
+def epoch_seconds(column, dialect_name: str):
+    """SQL expression turning a timestamp column into integer Unix seconds"""
+    if dialect_name == "sqlite":
+        return cast(func.strftime("%s", column), BigInteger)
+    return cast(func.extract("epoch", column), BigInteger)
+
+
+def in_range(query, start: Optional[datetime], end: Optional[datetime], order=Order):
+    if start:
+        query = query.filter(order.created_at >= start)
+    if end:
+        query = query.filter(order.created_at < end)
+    return query
+
+
+def order_tables(include_archived: bool):
+    """(order, order item) models to read, archive first as it holds the older orders"""
+    return (ARCHIVE_TABLES, LIVE_TABLES) if include_archived else (LIVE_TABLES,)
+
+
+def stream_array(conn, query, width: int, chunk_size: int = CHUNK_SIZE) -> np.ndarray:
+    """Stream an all-integer query into an (n, width) int64 array, one chunk at a time.
+
+    SQLite steps its cursor lazily, so rows are read straight from the DBAPI
+    cursor without building Row objects. Backends with server-side cursors
+    (Postgres) stream through SQLAlchemy's yield_per partitions instead.
+    """
+    if conn.dialect.supports_server_side_cursors:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        batches = result.partitions()
+    else:
+        result = conn.execute(query)
+        cursor = result.cursor
+        batches = iter(lambda: cursor.fetchmany(chunk_size), [])
+
+    chunks = []
+    try:
+        for rows in batches:
+            chunks.append(np.array(rows, dtype=np.int64).reshape(-1, width))
+    finally:
+        result.close()
+    if not chunks:
+        return np.empty((0, width), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def load_orders(conn, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                include_archived: bool = True) -> Dict[str, np.ndarray]:
+    """Non-cancelled orders as columns: id, created_at (Unix seconds), total_amount (paisa), delivery"""
+    parts = []
+    for order, _ in order_tables(include_archived):
+        query = in_range(select(
+            order.id,
+            epoch_seconds(order.created_at, conn.dialect.name),
+            order.total_amount,
+            case((order.delivery_type == "delivery", 1), else_=0),
+        ).filter(order.status != "cancelled"), start, end, order)
+        parts.append(stream_array(conn, query, 4))
+    data = np.concatenate(parts)
+    return {
+        "order_id": data[:, 0],
+        "created_at": data[:, 1],
+        "total_amount": data[:, 2],
+        "delivery": data[:, 3],
+    }
+
+
+def load_items(conn, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               include_archived: bool = True) -> Dict[str, np.ndarray]:
+    """Items of non-cancelled orders as columns, sorted by order id within the live and archive tables"""
+    parts = []
+    for order, order_item in order_tables(include_archived):
+        query = in_range(select(
+            order_item.order_id,
+            epoch_seconds(order.created_at, conn.dialect.name),
+            order_item.menu_item_id,
+            order_item.price,
+            order_item.quantity,
+        ).join(order, order.id == order_item.order_id).filter(order.status != "cancelled"), start, end, order)
+        parts.append(stream_array(conn, query.order_by(order_item.order_id), 5))
+    data = np.concatenate(parts)
+    return {
+        "order_id": data[:, 0],
+        "created_at": data[:, 1],
+        "menu_item_id": data[:, 2],
+        "price": data[:, 3],
+        "quantity": data[:, 4],
+    }
+
+
+def summary(orders: Dict[str, np.ndarray], percentiles=(50, 90, 95, 99)) -> Dict:
+    totals = orders["total_amount"]
+    if not len(totals):
+        return {"order_count": 0, "revenue": 0, "average_order_value": 0, "delivery_share": 0.0, "percentiles": {}}
+    values = np.percentile(totals, percentiles)
+    return {
+        "order_count": int(len(totals)),
+        "revenue": int(totals.sum()),
+        "average_order_value": int(totals.mean()),
+        "delivery_share": float(orders["delivery"].mean()),
+        "percentiles": {f"p{p}": int(v) for p, v in zip(percentiles, values)},
+    }
+
+
+def heatmap(orders: Dict[str, np.ndarray], utc_offset_minutes: int = 0) -> Dict:
+    """Order count and revenue per day of week (Monday first) and hour of day"""
+    local = orders["created_at"] + utc_offset_minutes * 60
+    # 1970-01-01 was a Thursday, so shift by 3 to make Monday day 0
+    weekday = (local // SECONDS_PER_DAY + 3) % 7
+    hour = (local // SECONDS_PER_HOUR) % 24
+    cell = weekday * 24 + hour
+    return {
+        "orders": np.bincount(cell, minlength=168).reshape(7, 24).tolist(),
+        "revenue": np.bincount(cell, weights=orders["total_amount"], minlength=168)
+                     .astype(np.int64).reshape(7, 24).tolist(),
+    }
+
+
+def moving_average(orders: Dict[str, np.ndarray], window: int = 7, utc_offset_minutes: int = 0) -> Dict:
+    """Daily order count and revenue with a trailing moving average over ``window`` days"""
+    if not len(orders["created_at"]):
+        return {"days": [], "orders": [], "revenue": [], "revenue_moving_average": []}
+    day = (orders["created_at"] + utc_offset_minutes * 60) // SECONDS_PER_DAY
+    first = day.min()
+    counts = np.bincount(day - first)
+    revenue = np.bincount(day - first, weights=orders["total_amount"])
+    # Trailing average; the first window-1 days average over what is available
+    cumulative = np.concatenate([[0.0], np.cumsum(revenue)])
+    index = np.arange(1, len(revenue) + 1)
+    lower = np.maximum(index - window, 0)
+    average = (cumulative[index] - cumulative[lower]) / (index - lower)
+    days = (first + np.arange(len(counts))) * SECONDS_PER_DAY
+    return {
+        "days": [datetime.utcfromtimestamp(int(d)).date().isoformat() for d in days],
+        "orders": counts.tolist(),
+        "revenue": revenue.astype(np.int64).tolist(),
+        "revenue_moving_average": np.round(average).astype(np.int64).tolist(),
+    }
+
+
+def top_items(items: Dict[str, np.ndarray], top: int = 10) -> Dict:
+    """Best selling menu items by quantity and by revenue"""
+    if not len(items["menu_item_id"]):
+        return {"by_quantity": [], "by_revenue": []}
+    ids, inverse = np.unique(items["menu_item_id"], return_inverse=True)
+    quantity = np.bincount(inverse, weights=items["quantity"]).astype(np.int64)
+    revenue = np.bincount(inverse, weights=items["price"] * items["quantity"]).astype(np.int64)
+
+    def ranked(values):
+        count = min(top, len(values))
+        best = np.argpartition(-values, count - 1)[:count]
+        best = best[np.argsort(-values[best], kind="stable")]
+        return [
+            {"menu_item_id": int(ids[i]), "quantity": int(quantity[i]), "revenue": int(revenue[i])}
+            for i in best
+        ]
+
+    return {"by_quantity": ranked(quantity), "by_revenue": ranked(revenue)}
+
+
+def basket(items: Dict[str, np.ndarray], top: int = 10) -> Dict:
+    """Menu item pairs most often ordered together, with support and lift"""
+    if not len(items["menu_item_id"]):
+        return {"orders": 0, "pairs": []}
+    ids, codes = np.unique(items["menu_item_id"], return_inverse=True)
+    width = len(ids)
+
+    # One entry per (order, item), sorted by order then item
+    keys = np.unique(items["order_id"] * width + codes)
+    order_ids, codes = keys // width, keys % width
+    order_count = len(np.unique(order_ids))
+    item_orders = np.bincount(codes, minlength=width)
+
+    # Pair every item with the ones after it in the same order, one offset at a time
+    pair_keys = []
+    offset = 1
+    while offset < len(order_ids):
+        same = order_ids[offset:] == order_ids[:-offset]
+        if not same.any():
+            break
+        pair_keys.append(codes[:-offset][same] * width + codes[offset:][same])
+        offset += 1
+    if not pair_keys:
+        return {"orders": order_count, "pairs": []}
+
+    pairs, counts = np.unique(np.concatenate(pair_keys), return_counts=True)
+    count = min(top, len(pairs))
+    best = np.argpartition(-counts, count - 1)[:count]
+    best = best[np.argsort(-counts[best], kind="stable")]
+
+    result = []
+    for i in best:
+        a, b = divmod(int(pairs[i]), width)
+        support = counts[i] / order_count
+        lift = support / ((item_orders[a] / order_count) * (item_orders[b] / order_count))
+        result.append({
+            "menu_item_ids": [int(ids[a]), int(ids[b])],
+            "orders": int(counts[i]),
+            "support": round(float(support), 4),
+            "lift": round(float(lift), 3),
+        })
+    return {"orders": order_count, "pairs": result}
+
+
+def run_report(report: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               top: int = 10, window: int = 7, utc_offset_minutes: int = 0,
+               include_archived: bool = True) -> Dict:
+    """Load the needed columns and compute one report; blocking, run it off the event loop"""
+    with databases.instance().read_engine.connect() as conn:
+        if report in ("top_items", "basket"):
+            items = load_items(conn, start, end, include_archived)
+            return top_items(items, top) if report == "top_items" else basket(items, top)
+
+        orders = load_orders(conn, start, end, include_archived)
+    if report == "heatmap":
+        return heatmap(orders, utc_offset_minutes)
+    if report == "moving_average":
+        return moving_average(orders, window, utc_offset_minutes)
+    return summary(orders)
+
+
+def export_query(kind: str, order, order_item):
+    if kind == "items":
+        return select(order_item.order_id, order.created_at, order.status, order_item.menu_item_id,
+                      order_item.name, order_item.price, order_item.quantity) \
+            .join(order, order.id == order_item.order_id).order_by(order_item.order_id, order_item.id)
+    return select(order.id, order.created_at, order.customer_name, order.delivery_type,
+                  order.status, order.total_amount).order_by(order.id)
+
+
+def export_csv(kind: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               chunk_size: int = CHUNK_SIZE, include_archived: bool = True) -> Iterator[str]:
+    """Yield a CSV export of orders or order items chunk by chunk from a server-side cursor.
+
+    Archived orders come first, then the live tables.
+    """
+    if kind == "items":
+        header = ["order_id", "created_at", "status", "menu_item_id", "name", "price", "quantity"]
+    else:
+        header = ["order_id", "created_at", "customer_name", "delivery_type", "status", "total_amount"]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    with databases.instance().read_engine.connect() as conn:
+        for order, order_item in order_tables(include_archived):
+            query = in_range(export_query(kind, order, order_item), start, end, order)
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+            for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -1 +1,141 @@
-from app.core.database import get_db
+from fastapi import Depends, Header, HTTPException, Request, WebSocket
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional
+from app.core.admission import (
+    ADMIN, ADMISSION_TRUST_FORWARDED, CUSTOMER, Rejected, admit_client, write_limiter,
+)
+from app.core.branches import DEFAULT_BRANCH, current_branch
+from app.core.database import AsyncSessionLocal, get_db, get_read_db
+from app.core.security import ADMIN_AUTH_REQUIRED, cache_user, decode_access_token, user_cache
+from app.models import User
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[Dict]:
+    """Auth fields of a user, from the user cache or one indexed query"""
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    result = await db.execute(select(User).filter(User.email == email))
+    user = result.scalars().first()
+    return cache_user(user) if user else None
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Optional[Dict]:
+    """The user a bearer token belongs to, or None for anonymous requests"""
+    if credentials is None:
+        return None
+    claims = decode_access_token(credentials.credentials)
+    # Tokens issued before branches existed belong to the default branch
+    if claims is not None and claims.get("branch", DEFAULT_BRANCH) != current_branch.get():
+        claims = None
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    user = await get_user_by_email(db, claims["sub"])
+    if not user or not user["is_active"]:
+        raise HTTPException(status_code=401, detail="Inactive or unknown user",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Optional[Dict]:
+    """Like get_current_user, but a bad or stale token counts as anonymous instead of a 401"""
+    try:
+        return await get_current_user(credentials, db)
+    except HTTPException:
+        return None
+
+async def get_current_admin(user: Optional[Dict] = Depends(get_current_user)) -> Optional[Dict]:
+    """Guard for admin endpoints; anonymous access is allowed unless ADMIN_AUTH_REQUIRED is set"""
+    if user is None:
+        if ADMIN_AUTH_REQUIRED:
+            raise HTTPException(status_code=401, detail="Not authenticated",
+                                headers={"WWW-Authenticate": "Bearer"})
+        return None
+    if not user["is_admin"]:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return user
+
+async def websocket_admin(websocket: WebSocket) -> bool:
+    """Whether an admin socket may connect, checked before it is accepted.
+
+    Browsers cannot set headers on WebSockets, so the token comes as
+    ``?token=``; it must belong to an active admin of the socket's branch.
+    Sockets without one are only let in while ADMIN_AUTH_REQUIRED is off.
+    """
+    token = websocket.query_params.get("token")
+    if not token:
+        return not ADMIN_AUTH_REQUIRED
+    claims = decode_access_token(token)
+    if claims is None or claims.get("branch", DEFAULT_BRANCH) != current_branch.get():
+        return False
+    async with AsyncSessionLocal() as db:
+        user = await get_user_by_email(db, claims["sub"])
+    return bool(user and user["is_active"] and user["is_admin"])
+
+def client_address(request: Request) -> str:
+    if ADMISSION_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+async def idempotency_scope(
+    user: Optional[Dict] = Depends(get_optional_user),
+    device_id: Optional[str] = Header(None, alias="X-Device-ID", min_length=1, max_length=255),
+) -> Optional[str]:
+    """Whose Idempotency-Keys a request may replay: the signed-in user's, else its device's.
+
+    None for anonymous requests without an ``X-Device-ID``; client
+    addresses change on mobile networks and are shared behind proxies, so
+    those keys are scoped to the request itself instead.
+    """
+    if user is not None:
+        return f"user:{user['id']}"
+    if device_id is not None:
+        return f"device:{device_id}"
+    return None
+
+def admit_write(lane: str):
+    """Dependency holding a write slot in ``lane`` until the request is done.
+
+    Customer writes are first charged to the client's token bucket (429
+    when empty); either lane gets a 503 when the write queue is shedding
+    load. Both carry a Retry-After header.
+    """
+    async def dependency(request: Request):
+        try:
+            if lane == CUSTOMER:
+                admit_client(client_address(request))
+            await write_limiter.acquire(lane)
+        except Rejected as e:
+            if e.reason == "rate_limited":
+                raise HTTPException(status_code=429, detail="Too many requests",
+                                    headers={"Retry-After": str(e.retry_after)})
+            raise HTTPException(status_code=503, detail="Server busy, please retry",
+                                headers={"Retry-After": str(e.retry_after)})
+        try:
+            yield
+        finally:
+            write_limiter.release(lane)
+    return dependency
+
+admin_write_slot = admit_write(ADMIN)
+
+async def admit_admin_write(
+    admin: Optional[Dict] = Depends(get_current_admin),
+    slot: None = Depends(admin_write_slot),
+) -> Optional[Dict]:
+    """Kitchen and menu writes: checks the admin first, so a request bound for a
+    401/403 never takes a slot in the priority lane ahead of customers"""
+    return admin
+
+# Customer order intake
+admit_customer_write = admit_write(CUSTOMER)
@@ -1,18 +1,244 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+from ..dependencies import get_read_db
+from app.analytics import columnar
+from app.core.branches import BRANCHES, use_branch
+from app.core.database import AsyncReadSessionLocal
+from app.crud.rollups import hour_bucket, naive_utc
+from app.models import ItemRollup, MenuItem, OrderRollup
 
 router = APIRouter()
 
+# All ranges are answered from hourly rollup buckets (UTC), never from the order tables,
+# so they keep counting orders moved to the archive tables
+GROUP_BY_PATTERN = "^(hour|day|delivery_type|category|menu_item)$"
+
+def resolve_range(start: Optional[datetime], end: Optional[datetime]):
+    """Default to the last 7 days; ``start`` is rounded down to its hour bucket"""
+    end = naive_utc(end) if end else datetime.utcnow()
+    start = start or end - timedelta(days=7)
+    return hour_bucket(start), end
+
+def bucket_key(bucket: datetime, group_by: str) -> str:
+    if group_by == "day":
+        return bucket.date().isoformat()
+    return bucket.isoformat()
+
+async def order_totals(db: AsyncSession, start: datetime, end: datetime) -> Dict:
+    result = await db.execute(
+        select(func.coalesce(func.sum(OrderRollup.order_count), 0),
+               func.coalesce(func.sum(OrderRollup.revenue), 0))
+        .filter(OrderRollup.bucket >= start, OrderRollup.bucket < end)
+    )
+    order_count, revenue = result.one()
+    return {
+        "order_count": order_count,
+        "revenue": revenue,
+        "average_order_value": revenue // order_count if order_count else 0,
+    }
+
+async def order_series(db: AsyncSession, start: datetime, end: datetime, group_by: str) -> List[Dict]:
+    """Order count and revenue per hour, day or delivery type"""
+    column = OrderRollup.delivery_type if group_by == "delivery_type" else OrderRollup.bucket
+    result = await db.execute(
+        select(column, func.sum(OrderRollup.order_count), func.sum(OrderRollup.revenue))
+        .filter(OrderRollup.bucket >= start, OrderRollup.bucket < end)
+        .group_by(column)
+        .order_by(column)
+    )
+
+    series: Dict[str, Dict] = {}
+    for key, order_count, revenue in result.all():
+        if group_by != "delivery_type":
+            key = bucket_key(key, group_by)
+        row = series.setdefault(key, {"key": key, "order_count": 0, "revenue": 0})
+        row["order_count"] += order_count
+        row["revenue"] += revenue
+    return list(series.values())
+
+async def item_series(db: AsyncSession, start: datetime, end: datetime, group_by: str,
+                      limit: Optional[int] = None) -> List[Dict]:
+    """Quantity and revenue per category or menu item, highest revenue first"""
+    if group_by == "category":
+        columns = [ItemRollup.category]
+    else:
+        columns = [ItemRollup.menu_item_id, ItemRollup.category]
+    revenue = func.sum(ItemRollup.revenue)
+    query = (
+        select(*columns, func.sum(ItemRollup.order_count), func.sum(ItemRollup.quantity), revenue)
+        .filter(ItemRollup.bucket >= start, ItemRollup.bucket < end)
+        .group_by(*columns)
+        .order_by(revenue.desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    rows = (await db.execute(query)).all()
+
+    names = {}
+    if group_by == "menu_item" and rows:
+        result = await db.execute(
+            select(MenuItem.id, MenuItem.name).filter(MenuItem.id.in_([row[0] for row in rows]))
+        )
+        names = dict(result.all())
+
+    series = []
+    for row in rows:
+        if group_by == "category":
+            category, order_count, quantity, revenue = row
+            series.append({"key": category, "order_count": order_count, "quantity": quantity, "revenue": revenue})
+        else:
+            menu_item_id, category, order_count, quantity, revenue = row
+            series.append({
+                "key": menu_item_id, "name": names.get(menu_item_id), "category": category,
+                "order_count": order_count, "quantity": quantity, "revenue": revenue,
+            })
+    return series
+
+async def branch_rollup(branch: str, start: datetime, end: datetime, group_by: str) -> Dict:
+    """Totals and series of one branch, read from that branch's database"""
+    with use_branch(branch):
+        async with AsyncReadSessionLocal() as db:
+            return {
+                "branch": branch,
+                **await order_totals(db, start, end),
+                "series": await order_series(db, start, end, group_by),
+            }
+
+def merge_series(results: List[Dict]) -> List[Dict]:
+    series: Dict[str, Dict] = {}
+    for result in results:
+        for row in result["series"]:
+            merged = series.setdefault(row["key"], {"key": row["key"], "order_count": 0, "revenue": 0})
+            merged["order_count"] += row["order_count"]
+            merged["revenue"] += row["revenue"]
+    return [series[key] for key in sorted(series)]
+
 @router.get("/")
-async def get_analytics():
+async def get_analytics(db: AsyncSession = Depends(get_read_db)):
     """Get analytics data for dashboard"""
-    return {"message": "Analytics endpoint - TODO: Implement revenue trends, KPIs, etc."}
+    now = datetime.utcnow()
+    return {
+        "last_24_hours": await order_totals(db, hour_bucket(now - timedelta(days=1)), now),
+        "last_7_days": await order_totals(db, hour_bucket(now - timedelta(days=7)), now),
+        "last_30_days": await order_totals(db, hour_bucket(now - timedelta(days=30)), now),
+    }
 
 @router.get("/revenue")
-async def get_revenue_analytics():
-    """Get revenue analytics"""
-    return {"message": "Revenue analytics - TODO: Implement"}
+async def get_revenue_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: str = Query("day", regex=GROUP_BY_PATTERN),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get revenue analytics for a date range, grouped by time, delivery type, category or item"""
+    start, end = resolve_range(start, end)
+    if group_by in ("category", "menu_item"):
+        series = await item_series(db, start, end, group_by)
+    else:
+        series = await order_series(db, start, end, group_by)
+    return {
+        "start": start,
+        "end": end,
+        "group_by": group_by,
+        **await order_totals(db, start, end),
+        "series": series,
+    }
 
 @router.get("/orders")
-async def get_order_analytics():
-    """Get order analytics"""
-    return {"message": "Order analytics - TODO: Implement"}
+async def get_order_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: str = Query("day", regex="^(hour|day)$"),
+    top: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get order analytics: volume over time, delivery type split and top items"""
+    start, end = resolve_range(start, end)
+    return {
+        "start": start,
+        "end": end,
+        "group_by": group_by,
+        **await order_totals(db, start, end),
+        "series": await order_series(db, start, end, group_by),
+        "by_delivery_type": await order_series(db, start, end, "delivery_type"),
+        "top_items": await item_series(db, start, end, "menu_item", limit=top),
+    }
+
+@router.get("/trends")
+async def get_trend_analytics(
+    report: str = Query("summary", regex=f"^({'|'.join(columnar.REPORTS)})$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    top: int = Query(10, ge=1, le=100),
+    window: int = Query(7, ge=1, le=365),
+    utc_offset_minutes: int = Query(0, ge=-720, le=840),
+    include_archived: bool = True,
+):
+    """Ad hoc trend reports computed column-wise over orders and order items.
+
+    Reports: summary (totals and order value percentiles), heatmap (day of week
+    x hour), moving_average (daily revenue), top_items and basket (item pairs).
+    Archived orders are included unless ``include_archived`` is false.
+    """
+    start = naive_utc(start) if start else None
+    end = naive_utc(end) if end else None
+    data = await run_in_threadpool(
+        columnar.run_report, report, start, end,
+        top=top, window=window, utc_offset_minutes=utc_offset_minutes, include_archived=include_archived,
+    )
+    return {"report": report, "start": start, "end": end, "data": data}
+
+@router.get("/export")
+async def export_analytics(
+    kind: str = Query("orders", regex="^(orders|items)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_archived: bool = True,
+):
+    """Stream orders or order items, archived ones included by default, as CSV without building the export in memory"""
+    start = naive_utc(start) if start else None
+    end = naive_utc(end) if end else None
+    return StreamingResponse(
+        columnar.export_csv(kind, start, end, include_archived=include_archived),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{kind}.csv"'},
+    )
+
+@router.get("/branches")
+async def get_branch_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: str = Query("day", regex="^(hour|day|delivery_type)$"),
+    branches: Optional[str] = Query(None, description="Comma separated branch ids, all by default"),
+):
+    """Order volume and revenue across branches.
+
+    Every branch keeps its own database, so the rollups of each are queried
+    concurrently and merged here; ``branches`` holds each branch's own
+    totals and series.
+    """
+    start, end = resolve_range(start, end)
+    selected = [branch.strip() for branch in branches.split(",")] if branches else BRANCHES
+    unknown = [branch for branch in selected if branch not in BRANCHES]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown branch '{unknown[0]}'")
+
+    results = await asyncio.gather(*(branch_rollup(branch, start, end, group_by) for branch in selected))
+    order_count = sum(result["order_count"] for result in results)
+    revenue = sum(result["revenue"] for result in results)
+    return {
+        "start": start,
+        "end": end,
+        "group_by": group_by,
+        "order_count": order_count,
+        "revenue": revenue,
+        "average_order_value": revenue // order_count if order_count else 0,
+        "series": merge_series(results),
+        "branches": results,
+    }
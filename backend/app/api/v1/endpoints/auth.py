@@ -1,13 +1,76 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional
+from ..dependencies import get_current_user, get_db, get_user_by_email
+from app.core.security import (
+    ACCESS_TOKEN_EXPIRE_MINUTES, HashingBusy, cache_user, create_access_token, hash_password, user_cache,
+    verify_password,
+)
+from app.models import User as UserModel
+from app.schemas import Token, User, UserCreate, UserLogin
 
 router = APIRouter()
 
-@router.post("/login")
-async def login():
-    """User login endpoint"""
-    return {"message": "Login endpoint - TODO: Implement JWT authentication"}
+def hashing_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Too many logins in progress, try again shortly",
+                         headers={"Retry-After": "1"})
 
-@router.post("/register")
-async def register():
-    """User registration endpoint"""
-    return {"message": "Register endpoint - TODO: Implement user creation"}
+@router.post("/login", response_model=Token)
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+    """User login endpoint; returns a bearer token"""
+    user = await get_user_by_email(db, credentials.email)
+    try:
+        valid = await verify_password(credentials.password, user["hashed_password"] if user else None)
+    except HashingBusy:
+        raise hashing_busy()
+    if not valid or not user["is_active"]:
+        raise HTTPException(status_code=401, detail="Incorrect email or password",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+    return {
+        "access_token": create_access_token(user["email"], is_admin=user["is_admin"]),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+@router.post("/register", response_model=User)
+async def register(
+    user: UserCreate,
+    current_user: Optional[Dict] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """User registration endpoint.
+
+    Accounts registered by anyone but a signed-in admin are never admins; the
+    first admin of a branch is created with create_admin.py.
+    """
+    if await get_user_by_email(db, user.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    is_admin = bool(user.is_admin and current_user and current_user["is_admin"])
+
+    try:
+        hashed_password = await hash_password(user.password)
+    except HashingBusy:
+        raise hashing_busy()
+
+    db_user = UserModel(
+        email=user.email,
+        hashed_password=hashed_password,
+        full_name=user.full_name,
+        is_active=user.is_active,
+        is_admin=is_admin,
+    )
+    db.add(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Registered concurrently with the same email
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
+    await db.refresh(db_user)
+
+    user_cache.pop(db_user.email)
+    cache_user(db_user)
+    return db_user
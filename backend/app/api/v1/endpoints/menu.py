@@ -1,42 +1,211 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..dependencies import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import json
+from ..dependencies import admit_admin_write, get_db, get_read_db
+from app.core.catalog import catalog
+from app.core.database import AsyncReadSessionLocal
+from app.core.outbox import dispatcher, enqueue_event
+from app.core.search import menu_search
+from app.core.serialization import FastJSONResponse, RowSerializer
+from app.core.websocket import manager
 from app.models import MenuItem as MenuItemModel
-from app.schemas import MenuItem, MenuItemCreate, MenuItemUpdate
+from app.schemas import MenuItem, MenuItemCreate, MenuItemUpdate, MenuSearchResponse
 
 router = APIRouter()
 
+# Responses are built from row tuples rather than validated from ORM instances
+menu_item_row = RowSerializer(MenuItem, MenuItemModel)
+
+def enqueue_menu_changed(db: AsyncSession):
+    """Tell the other workers, in the write's transaction, to drop their menu snapshot and search index"""
+    enqueue_event(db, {"type": "menu_changed", "data": {"origin": catalog.epoch}})
+
+def connect_menu_caches():
+    """Invalidate the current branch's menu caches on menu writes committed by other workers"""
+    branch_catalog, branch_search = catalog.instance(), menu_search.instance()
+
+    def apply_menu_event(message: Dict):
+        # The writing worker already updated its own caches
+        if message.get("type") == "menu_changed" and message["data"]["origin"] != branch_catalog.epoch:
+            branch_catalog.bump_version()
+            branch_search.invalidate()
+
+    manager.instance().listeners.append(apply_menu_event)
+
 @router.get("/", response_model=List[MenuItem])
 async def get_menu(
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = None,
     available_only: bool = True,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get menu items with optional filters, served from the catalog snapshot.
+
+    Snapshots are rebuilt from the primary (get_db), as a lagging replica could
+    cache stale items under the new catalog version.
+    """
+    headers = {"ETag": catalog.etag(), "Cache-Control": "public, no-cache"}
+    if catalog.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    if not catalog.is_fresh():
+        version = catalog.version
+        result = await db.execute(select(*menu_item_row.columns).order_by(MenuItemModel.id))
+        catalog.load(menu_item_row.many(result.all()), version)
+        headers["ETag"] = catalog.etag(version)
+
+    body = catalog.render(category, available_only, skip, limit)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Fields written to and read from NDJSON menu dumps
+EXPORT_FIELDS = ["id", "name", "price", "category", "description", "available"]
+# Import errors reported back to the client, beyond which they are only counted
+MAX_IMPORT_ERRORS = 100
+
+@router.get("/export")
+async def export_menu(chunk_size: int = Query(500, ge=1, le=10000)):
+    """Stream the whole menu as NDJSON, one item per line, from a server-side cursor"""
+    async def generate():
+        async with AsyncReadSessionLocal() as db:
+            columns = [getattr(MenuItemModel, field) for field in EXPORT_FIELDS]
+            result = await db.stream(
+                select(*columns).order_by(MenuItemModel.id).execution_options(yield_per=chunk_size)
+            )
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_FIELDS, row)), separators=(",", ":")) + "\n" for row in rows
+                )
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="menu.ndjson"'},
+    )
+
+@router.get("/search", response_model=MenuSearchResponse)
+async def search_menu(
+    q: str = Query(..., min_length=1, max_length=100),
+    category: Optional[str] = None,
+    available_only: bool = True,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get menu items with optional filters"""
-    query = db.query(MenuItemModel)
+    """Search menu items by name, description and category.
+
+    Tolerates typos and matches the last word as a prefix, for search as you
+    type. Results are ranked by relevance; category facet counts cover every
+    match so the other categories can be offered as refinements.
+    """
+    if not menu_search.loaded:
+        generation = menu_search.generation
+        result = await db.execute(select(*menu_item_row.columns).order_by(MenuItemModel.id))
+        menu_search.load(menu_item_row.many(result.all()), generation)
+    return FastJSONResponse(menu_search.search(q, category, available_only, limit))
+
+async def ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """Split the request body into lines as it arrives"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+async def upsert_menu_items(db: AsyncSession, items: Dict[Tuple[str, str], MenuItemCreate]) -> Tuple[int, int]:
+    """Insert or update a chunk of menu items keyed by (name, category) in one transaction"""
+    result = await db.execute(
+        select(MenuItemModel).filter(tuple_(MenuItemModel.name, MenuItemModel.category).in_(list(items)))
+    )
+    existing = {(menu_item.name, menu_item.category): menu_item for menu_item in result.scalars()}
+    for key, menu_item in existing.items():
+        for field, value in items[key].dict().items():
+            setattr(menu_item, field, value)
+
+    new_items = [item.dict() for key, item in items.items() if key not in existing]
+    if new_items:
+        await db.execute(insert(MenuItemModel), new_items)
+
+    await db.commit()
+    db.expunge_all()
+    return len(new_items), len(existing)
+
+@router.post("/import", dependencies=[Depends(admit_admin_write)])
+async def import_menu(
+    request: Request,
+    chunk_size: int = Query(500, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upsert menu items from an NDJSON body (admin only).
+
+    Lines are parsed as they arrive and upserted by name and category in
+    transactions of ``chunk_size`` items. Menu caches, here and in the
+    other workers, are invalidated once at the end, and also when a later
+    chunk fails or the client goes away after earlier chunks were committed.
+    """
+    created = updated = failed = 0
+    errors = []
+    pending: Dict[Tuple[str, str], MenuItemCreate] = {}
+
+    try:
+        line_number = 0
+        async for line in ndjson_lines(request):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                item = MenuItemCreate(**json.loads(line))
+            except (ValueError, TypeError, ValidationError) as e:
+                failed += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
 
-    if category:
-        query = query.filter(MenuItemModel.category == category)
+            pending[(item.name, item.category)] = item
+            if len(pending) >= chunk_size:
+                chunk_created, chunk_updated = await upsert_menu_items(db, pending)
+                created += chunk_created
+                updated += chunk_updated
+                pending = {}
 
-    if available_only:
-        query = query.filter(MenuItemModel.available == True)
+        if pending:
+            chunk_created, chunk_updated = await upsert_menu_items(db, pending)
+            created += chunk_created
+            updated += chunk_updated
+    finally:
+        if created or updated:
+            catalog.bump_version()
+            menu_search.invalidate()
+            # One event for the whole import, after its last committed chunk
+            try:
+                await db.rollback()
+                enqueue_menu_changed(db)
+                await db.commit()
+                dispatcher.wake()
+            except Exception as e:
+                print(f"Error announcing menu import: {e}")
 
-    menu_items = query.offset(skip).limit(limit).all()
-    return menu_items
+    return {"created": created, "updated": updated, "failed": failed, "errors": errors}
 
 @router.get("/{item_id}", response_model=MenuItem)
-async def get_menu_item(item_id: int, db: Session = Depends(get_db)):
+async def get_menu_item(item_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get specific menu item"""
-    menu_item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
-    if not menu_item:
+    result = await db.execute(select(*menu_item_row.columns).filter(MenuItemModel.id == item_id))
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Menu item not found")
-    return menu_item
+    return FastJSONResponse(menu_item_row(row))
 
-@router.post("/", response_model=MenuItem)
-async def create_menu_item(menu_item: MenuItemCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=MenuItem,
+             dependencies=[Depends(admit_admin_write)])
+async def create_menu_item(menu_item: MenuItemCreate, db: AsyncSession = Depends(get_db)):
     """Create new menu item (admin only)"""
     db_menu_item = MenuItemModel(
         name=menu_item.name,
@@ -46,18 +215,23 @@ async def create_menu_item(menu_item: MenuItemCreate, db: Session = Depends(get_
         available=menu_item.available
     )
     db.add(db_menu_item)
-    db.commit()
-    db.refresh(db_menu_item)
+    enqueue_menu_changed(db)
+    await db.commit()
+    dispatcher.wake()
+    catalog.bump_version()
+    await db.refresh(db_menu_item)
+    menu_search.upsert(menu_item_row.from_instance(db_menu_item))
     return db_menu_item
 
-@router.put("/{item_id}", response_model=MenuItem)
+@router.put("/{item_id}", response_model=MenuItem,
+            dependencies=[Depends(admit_admin_write)])
 async def update_menu_item(
     item_id: int,
     menu_item_update: MenuItemUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update menu item (admin only)"""
-    db_menu_item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
+    db_menu_item = await db.get(MenuItemModel, item_id)
     if not db_menu_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
 
@@ -65,17 +239,25 @@ async def update_menu_item(
     for field, value in update_data.items():
         setattr(db_menu_item, field, value)
 
-    db.commit()
-    db.refresh(db_menu_item)
+    enqueue_menu_changed(db)
+    await db.commit()
+    dispatcher.wake()
+    catalog.bump_version()
+    await db.refresh(db_menu_item)
+    menu_search.upsert(menu_item_row.from_instance(db_menu_item))
     return db_menu_item
 
-@router.delete("/{item_id}")
-async def delete_menu_item(item_id: int, db: Session = Depends(get_db)):
+@router.delete("/{item_id}", dependencies=[Depends(admit_admin_write)])
+async def delete_menu_item(item_id: int, db: AsyncSession = Depends(get_db)):
     """Delete menu item (admin only)"""
-    db_menu_item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
+    db_menu_item = await db.get(MenuItemModel, item_id)
     if not db_menu_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
 
-    db.delete(db_menu_item)
-    db.commit()
+    await db.delete(db_menu_item)
+    enqueue_menu_changed(db)
+    await db.commit()
+    dispatcher.wake()
+    catalog.bump_version()
+    menu_search.remove(item_id)
     return {"message": "Menu item deleted successfully"}
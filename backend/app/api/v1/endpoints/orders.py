@@ -1,119 +1,589 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..dependencies import get_db
-from app.core.websocket import manager
-from app.models import Order as OrderModel, OrderItem as OrderItemModel, MenuItem
-from app.schemas import OrderCreate, OrderUpdate, Order, OrderItem
+import asyncio
+import base64
+import hashlib
+import json
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Dict, List, Optional, Tuple
+from ..dependencies import (
+    admit_admin_write, admit_customer_write, get_current_admin, get_db, get_read_db, idempotency_scope,
+)
+from app.core.active_orders import OPEN_STATUSES, active_orders, can_transition
+from app.core.catalog import catalog
+from app.core.database import AsyncReadSessionLocal, AsyncSessionLocal
+from app.core.idempotency import IdempotencyMismatch, idempotency_cache, scoped_key
+from app.core.outbox import dispatcher, enqueue_event
+from app.core.serialization import FastJSONResponse, RowSerializer, dumps
+from app.core.websocket import ORDER_STREAM_KEEPALIVE, manager
+from app.crud.rollups import apply_rollups, order_entry
+from app.models import ArchivedOrder, ArchivedOrderItem, Order as OrderModel, OrderItem as OrderItemModel, MenuItem
+from app.schemas import OrderCreate, OrderStatusUpdate, Order, OrderBatchResponse, OrderItem
 
 router = APIRouter()
 
-@router.post("/", response_model=Order)
-async def create_order(order: OrderCreate, db: Session = Depends(get_db)):
-    """Create new order and notify admins"""
-    # Validate menu items exist and are available
-    for item in order.items:
-        menu_item = db.query(MenuItem).filter(
-            MenuItem.id == item.menu_item_id,
-            MenuItem.available == True
-        ).first()
-        if not menu_item:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Menu item {item.menu_item_id} not found or unavailable"
-            )
+# Responses are built from row tuples rather than validated from ORM instances
+order_row = RowSerializer(Order, OrderModel)
+order_item_row = RowSerializer(OrderItem, OrderItemModel)
+archived_order_row = RowSerializer(Order, ArchivedOrder)
+archived_order_item_row = RowSerializer(OrderItem, ArchivedOrderItem)
 
-    # Create order
-    db_order = OrderModel(
-        customer_name=order.customer_name,
-        customer_email=order.customer_email,
-        customer_phone=order.customer_phone,
-        delivery_type=order.delivery_type,
-        delivery_address=order.delivery_address,
-        status=order.status,
-        total_amount=order.total_amount,
+async def serialize_orders(db: AsyncSession, rows) -> List[Dict]:
+    """Order responses for rows selected with ``order_row.columns``, items attached in one query"""
+    orders = order_row.many(rows)
+    if not orders:
+        return orders
+    by_id = {}
+    for order in orders:
+        order["items"] = []
+        by_id[order["id"]] = order
+    result = await db.execute(
+        select(*order_item_row.columns)
+        .filter(OrderItemModel.order_id.in_(list(by_id)))
+        .order_by(OrderItemModel.id)
     )
-    db.add(db_order)
-    db.flush()  # Get the order ID
+    for row in result:
+        item = order_item_row(row)
+        by_id[item["order_id"]]["items"].append(item)
+    return orders
 
-    # Create order items
-    for item in order.items:
-        db_order_item = OrderItemModel(
-            order_id=db_order.id,
-            menu_item_id=item.menu_item_id,
-            name=item.name,
-            price=item.price,
-            quantity=item.quantity,
-        )
-        db.add(db_order_item)
-
-    db.commit()
-    db.refresh(db_order)
-
-    # Notify admins of new order
-    order_data = {
-        "id": db_order.id,
-        "customer_name": db_order.customer_name,
-        "delivery_type": db_order.delivery_type,
-        "total_amount": db_order.total_amount,
-        "created_at": db_order.created_at.isoformat(),
+async def load_order_data(db: AsyncSession, order_id: int) -> Optional[Dict]:
+    """Response for one order, or None if it does not exist"""
+    result = await db.execute(select(*order_row.columns).filter(OrderModel.id == order_id))
+    orders = await serialize_orders(db, result.all())
+    return orders[0] if orders else None
+
+async def load_archived_order_data(db: AsyncSession, order_id: int) -> Optional[Dict]:
+    """Response for an order moved to the archive tables by archive_orders.py, or None"""
+    row = (await db.execute(select(*archived_order_row.columns).filter(ArchivedOrder.id == order_id))).first()
+    if row is None:
+        return None
+    order = archived_order_row(row)
+    result = await db.execute(
+        select(*archived_order_item_row.columns)
+        .filter(ArchivedOrderItem.order_id == order_id)
+        .order_by(ArchivedOrderItem.id)
+    )
+    order["items"] = archived_order_item_row.many(result.all())
+    return order
+
+async def load_order(db: AsyncSession, order_id: int) -> Optional[OrderModel]:
+    """Load an order together with its items in a single round of queries"""
+    result = await db.execute(
+        select(OrderModel)
+        .options(selectinload(OrderModel.items))
+        .filter(OrderModel.id == order_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+def order_notification(order: OrderModel) -> Dict:
+    """Payload sent to admins for an order with its items loaded"""
+    return {
+        "id": order.id,
+        "customer_name": order.customer_name,
+        "delivery_type": order.delivery_type,
+        "status": order.status,
+        "total_amount": order.total_amount,
+        "estimated_time": order.estimated_time,
+        "created_at": order.created_at.isoformat(),
         "items": [
             {
                 "name": item.name,
                 "quantity": item.quantity,
                 "price": item.price
-            } for item in db_order.items
+            } for item in order.items
         ]
     }
-    await manager.notify_new_order(order_data)
 
-    return db_order
+def new_order_notification(order_id: int, created_at: datetime, order: OrderCreate,
+                           total_amount: int, lines: List[Dict]) -> Dict:
+    """Admin payload for a new order, built from its priced lines before commit"""
+    return {
+        "id": order_id,
+        "customer_name": order.customer_name,
+        "delivery_type": order.delivery_type,
+        "status": "pending",
+        "total_amount": total_amount,
+        "estimated_time": order.estimated_time,
+        "created_at": created_at.isoformat(),
+        "items": [
+            {"name": line["name"], "quantity": line["quantity"], "price": line["price"]}
+            for line in lines
+        ],
+    }
+
+async def load_active_orders():
+    """Fill the active order index from the database; run on startup"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(OrderModel)
+            .options(selectinload(OrderModel.items))
+            .filter(OrderModel.status.in_(OPEN_STATUSES))
+            .order_by(OrderModel.created_at, OrderModel.id)
+        )
+        active_orders.load(order_notification(order) for order in result.scalars().all())
+
+async def admin_snapshot() -> Dict:
+    """Open orders sent to admin sockets that reconnect after missing too many events"""
+    if not active_orders.loaded:
+        await load_active_orders()
+    return {"orders": active_orders.orders()}
+
+def connect_active_orders():
+    """Hook the current branch's active order index into its admin socket manager, before it starts"""
+    branch_manager = manager.instance()
+    branch_manager.snapshot_provider = admin_snapshot
+    # Orders created or updated by other workers reach this one's index through the event bus
+    branch_manager.listeners.append(active_orders.apply_event)
+
+async def resolve_menu_items(db: AsyncSession, menu_item_ids) -> Dict[int, Dict]:
+    """Look up menu items by id from the catalog snapshot, or in one query"""
+    menu_items = catalog.get_items(menu_item_ids)
+    if menu_items is not None:
+        return menu_items
+
+    result = await db.execute(
+        select(MenuItem.id, MenuItem.name, MenuItem.price, MenuItem.category, MenuItem.available)
+        .filter(MenuItem.id.in_(menu_item_ids))
+    )
+    rows = result.all()
+    return {
+        row.id: {
+            "id": row.id, "name": row.name, "price": row.price,
+            "category": row.category, "available": row.available,
+        }
+        for row in rows
+    }
+
+def price_order_items(order: OrderCreate, menu_items: Dict[int, Dict]) -> List[Dict]:
+    """Validate order lines and price them from authoritative menu data"""
+    lines = []
+    for item in order.items:
+        menu_item = menu_items.get(item.menu_item_id)
+        if not menu_item or not menu_item["available"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Menu item {item.menu_item_id} not found or unavailable"
+            )
+        if item.quantity <= 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid quantity for menu item {item.menu_item_id}"
+            )
+        lines.append({
+            "menu_item_id": item.menu_item_id,
+            "name": menu_item["name"],
+            "price": menu_item["price"],
+            "quantity": item.quantity,
+            "category": menu_item["category"],
+        })
+    return lines
+
+def order_values(order: OrderCreate, total_amount: int) -> Dict:
+    """Column values for a new order row"""
+    return {
+        "customer_name": order.customer_name,
+        "customer_email": order.customer_email,
+        "customer_phone": order.customer_phone,
+        "delivery_type": order.delivery_type,
+        "delivery_address": order.delivery_address,
+        "status": "pending",
+        "total_amount": total_amount,
+    }
+
+async def place_order(db: AsyncSession, order: OrderCreate) -> Tuple[Dict, Dict]:
+    """Insert an order in the session's transaction; returns its response and the admin notification.
+
+    The caller commits, then calls ``order_placed``.
+    """
+    # Validate menu items exist and are available, then price them server-side
+    menu_items = await resolve_menu_items(db, {item.menu_item_id for item in order.items})
+    lines = price_order_items(order, menu_items)
+    total_amount = sum(line["price"] * line["quantity"] for line in lines)
+
+    # Create order
+    db_order = OrderModel(**order_values(order, total_amount))
+    db.add(db_order)
+    await db.flush()  # Get the order ID
+
+    # Create order items in a single bulk insert
+    for line in lines:
+        line["order_id"] = db_order.id
+    if lines:
+        await db.execute(insert(OrderItemModel), lines)
+
+    # Roll the order into the analytics buckets in the same transaction
+    await apply_rollups(
+        db,
+        [(db_order.created_at, db_order.delivery_type, total_amount,
+          [(line["menu_item_id"], line["price"], line["quantity"], line["category"]) for line in lines])],
+        {menu_item_id: menu_item["category"] for menu_item_id, menu_item in menu_items.items()},
+    )
+
+    # Record the admin notification atomically with the order
+    notification = new_order_notification(db_order.id, db_order.created_at, order, total_amount, lines)
+    enqueue_event(db, {"type": "new_order", "data": notification})
+    return await load_order_data(db, db_order.id), notification
+
+def order_placed(notification: Dict):
+    """Deliver a committed order's notification and add it to the active board"""
+    dispatcher.wake()
+    active_orders.add(notification)
+
+@router.post("/", response_model=Order, dependencies=[Depends(admit_customer_write)])
+async def create_order(
+    order: OrderCreate,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255),
+    scope: Optional[str] = Depends(idempotency_scope),
+):
+    """Create new order and notify admins through the outbox.
+
+    Clients that retry on timeouts should send an ``Idempotency-Key`` header:
+    for IDEMPOTENCY_TTL seconds a repeated key gets the first response back
+    (with ``Idempotent-Replayed: true``) without placing the order again,
+    concurrent requests with the key wait for the first one, and reusing
+    the key for a different order is a 422. Keys are scoped to the
+    signed-in user, or else to the ``X-Device-ID`` header, so another
+    client sending the same key places its own order; anonymous clients
+    without a device id only get replays of the very same order.
+    """
+    if idempotency_key is None:
+        data, notification = await place_order(db, order)
+        await db.commit()
+        order_placed(notification)
+        return FastJSONResponse(data)
+
+    fingerprint = hashlib.sha256(order.json().encode("utf-8")).hexdigest()
+    key = scoped_key(scope or f"request:{fingerprint}", idempotency_key)
+
+    async def execute():
+        data, notification = await place_order(db, order)
+        response = idempotency_cache.response(fingerprint, 200, dumps(data))
+        await idempotency_cache.stage(db, key, response)
+        await db.commit()
+        order_placed(notification)
+        return response
+
+    try:
+        response, replayed = await idempotency_cache.run(db, key, fingerprint, execute)
+    except IdempotencyMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return Response(response.body, status_code=response.status_code, media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"} if replayed else None)
+
+@router.post("/batch", response_model=OrderBatchResponse, dependencies=[Depends(admit_customer_write)])
+async def create_orders_batch(
+    orders: List[OrderCreate],
+    chunk_size: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create many orders at once (aggregator integrations) and notify admins per chunk.
+
+    The whole batch is validated against the menu in one pass. Valid orders are
+    bulk inserted in transactions of ``chunk_size`` orders, each of which records
+    a single batch notification in the outbox; every order gets its own
+    created/failed entry in the results.
+    """
+    menu_items = await resolve_menu_items(
+        db, {item.menu_item_id for order in orders for item in order.items}
+    )
+    categories = {menu_item_id: menu_item["category"] for menu_item_id, menu_item in menu_items.items()}
+
+    results = [None] * len(orders)
+    valid = []  # (index, order, lines, total_amount)
+    for index, order in enumerate(orders):
+        try:
+            lines = price_order_items(order, menu_items)
+        except HTTPException as e:
+            results[index] = {"index": index, "status": "failed", "error": e.detail}
+            continue
+        valid.append((index, order, lines, sum(line["price"] * line["quantity"] for line in lines)))
+
+    created_count = 0
+    order_table = OrderModel.__table__
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        try:
+            result = await db.execute(
+                insert(order_table).returning(
+                    order_table.c.id, order_table.c.created_at, sort_by_parameter_order=True
+                ),
+                [order_values(order, total_amount) for _, order, _, total_amount in chunk],
+            )
+            created = result.all()
+
+            item_rows = []
+            entries = []
+            notifications = []
+            for (index, order, lines, total_amount), (order_id, created_at) in zip(chunk, created):
+                for line in lines:
+                    item_rows.append({**line, "order_id": order_id})
+                entries.append((created_at, order.delivery_type, total_amount,
+                                [(line["menu_item_id"], line["price"], line["quantity"], line["category"])
+                                 for line in lines]))
+                notifications.append(new_order_notification(order_id, created_at, order, total_amount, lines))
+            if item_rows:
+                await db.execute(insert(OrderItemModel.__table__), item_rows)
+            await apply_rollups(db, entries, categories)
+            enqueue_event(db, {
+                "type": "new_orders_batch",
+                "data": {"count": len(notifications), "orders": notifications},
+            })
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            for index, _, _, _ in chunk:
+                results[index] = {"index": index, "status": "failed", "error": f"Database error: {e.__class__.__name__}"}
+            continue
+
+        dispatcher.wake()
+        for notification in notifications:
+            active_orders.add(notification)
+        created_count += len(chunk)
+        for (index, order, lines, total_amount), (order_id, created_at) in zip(chunk, created):
+            results[index] = {"index": index, "status": "created", "order_id": order_id, "total_amount": total_amount}
+
+    return {"created": created_count, "failed": len(orders) - created_count, "results": results}
+
+def encode_cursor(order) -> str:
+    """Opaque keyset cursor pointing just past ``order``"""
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/", response_model=List[Order])
 async def get_orders(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    skip: Optional[int] = Query(None, ge=0, deprecated=True,
+                                description="Offset paging for older clients; follow X-Next-Cursor instead"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get orders with optional filters"""
-    query = db.query(OrderModel)
+    """Get live orders newest first, paginated by the X-Next-Cursor response header.
+
+    ``skip`` is still honoured as an offset when no cursor is given, but
+    deep offsets scan every skipped row. Archived orders are not listed;
+    GET /orders/{order_id} still finds them.
+    """
+    if skip and cursor:
+        raise HTTPException(status_code=400, detail="Use either cursor or skip, not both")
+
+    query = select(*order_row.columns).order_by(OrderModel.created_at.desc(), OrderModel.id.desc())
 
     if status:
         query = query.filter(OrderModel.status == status)
 
-    orders = query.offset(skip).limit(limit).all()
-    return orders
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            OrderModel.created_at < created_at,
+            and_(OrderModel.created_at == created_at, OrderModel.id < order_id),
+        ))
+    elif skip:
+        query = query.offset(skip)
+
+    result = await db.execute(query.limit(limit))
+    rows = result.all()
+    headers = {"X-Next-Cursor": encode_cursor(rows[-1])} if len(rows) == limit else None
+    return FastJSONResponse(await serialize_orders(db, rows), headers=headers)
+
+@router.get("/active", dependencies=[Depends(get_current_admin)])
+async def get_active_orders(status: Optional[str] = Query(None, regex=f"^({'|'.join(OPEN_STATUSES)})$")):
+    """Open orders for the kitchen board, grouped by status and oldest first.
+
+    Served from the in-memory active order index, so the cost depends on the
+    number of open orders rather than the order history.
+    """
+    return FastJSONResponse(active_orders.board([status] if status else OPEN_STATUSES))
 
 @router.get("/{order_id}", response_model=Order)
-async def get_order(order_id: int, db: Session = Depends(get_db)):
-    """Get specific order"""
-    order = db.query(OrderModel).filter(OrderModel.id == order_id).first()
+async def get_order(
+    order_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    primary: AsyncSession = Depends(get_db)
+):
+    """Get specific order, including finished orders that have been archived"""
+    # Customers poll right after checkout, which a lagging replica may not have seen yet
+    order = (
+        await load_order_data(db, order_id)
+        or await load_archived_order_data(db, order_id)
+        or await load_order_data(primary, order_id)
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    return FastJSONResponse(order)
+
+async def order_tracking_state(order_id: int) -> Optional[Dict]:
+    """Current status of an order, the first event of a tracking stream.
+
+    Uses short-lived sessions rather than a request dependency, which would
+    hold a connection for as long as the stream stays open.
+    """
+    queries = [
+        select(model.id.label("order_id"), model.status, model.estimated_time, model.payment_status)
+        .filter(model.id == order_id)
+        for model in (OrderModel, ArchivedOrder)
+    ]
+    for session_factory in (AsyncReadSessionLocal, AsyncSessionLocal):
+        async with session_factory() as db:
+            for query in queries:
+                row = (await db.execute(query)).first()
+                if row:
+                    return dict(row._mapping)
+    return None
+
+def sse_event(event_type: str, text: str) -> str:
+    return f"event: {event_type}\ndata: {text}\n\n"
+
+@router.get("/{order_id}/events")
+async def order_events(order_id: int):
+    """Server-Sent Events stream of an order's status and payment changes.
+
+    Starts with an ``order_status`` event holding the current state, then
+    relays ``order_status_change`` and ``payment_status_change`` events as
+    they happen, and ends once the order is delivered or cancelled. Idle
+    streams get a comment every ORDER_STREAM_KEEPALIVE seconds. Replaces
+    polling GET /orders/{order_id}; the WebSocket at /orders/{order_id}/ws
+    sends the same events as JSON messages.
+    """
+    # Subscribe before reading the state so no change can slip in between
+    subscription = manager.subscribe(order_id)
+    try:
+        state = await order_tracking_state(order_id)
+    except Exception:
+        manager.unsubscribe(subscription)
+        raise
+    if state is None:
+        manager.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Order not found")
 
-@router.put("/{order_id}/status", response_model=Order)
+    async def stream():
+        try:
+            yield "retry: 3000\n\n" + sse_event("order_status", json.dumps({"type": "order_status", "data": state}))
+            if state["status"] not in OPEN_STATUSES:
+                return
+            while True:
+                events = await subscription.next(ORDER_STREAM_KEEPALIVE)
+                if not events:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "".join(sse_event(event_type, text) for event_type, text in events)
+                if subscription.closed:
+                    return
+        finally:
+            manager.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/{order_id}/ws")
+async def order_events_websocket(websocket: WebSocket, order_id: int):
+    """WebSocket alternative to the order events stream, for clients without EventSource"""
+    await websocket.accept()
+    subscription = manager.subscribe(order_id)
+    receiver = None
+    try:
+        state = await order_tracking_state(order_id)
+        if state is None:
+            await websocket.close(code=4404)
+            return
+        await websocket.send_text(json.dumps({"type": "order_status", "data": state}))
+        if state["status"] not in OPEN_STATUSES:
+            await websocket.close()
+            return
+
+        # Watch for the client going away while waiting for events
+        receiver = asyncio.ensure_future(websocket.receive())
+        while True:
+            done, _ = await asyncio.wait(
+                {receiver, subscription.ready()}, timeout=ORDER_STREAM_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    return
+                receiver = asyncio.ensure_future(websocket.receive())
+                continue
+            events = subscription.drain()
+            if not events:
+                await websocket.send_text('{"type": "keepalive"}')
+                continue
+            for _, text in events:
+                await websocket.send_text(text)
+            if subscription.closed:
+                await websocket.close()
+                return
+    except Exception as e:
+        print(f"Order websocket error: {e}")
+    finally:
+        if receiver is not None and not receiver.done():
+            receiver.cancel()
+        manager.unsubscribe(subscription)
+
+@router.put("/{order_id}/status", response_model=Order,
+            dependencies=[Depends(admit_admin_write)])
 async def update_order_status(
     order_id: int,
-    status_update: dict,  # Simple dict for status update
-    db: Session = Depends(get_db)
+    status_update: OrderStatusUpdate,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Update order status and notify admins"""
-    order = db.query(OrderModel).filter(OrderModel.id == order_id).first()
+    """Move an order along pending -> accepted -> preparing -> ready -> delivered (or cancel it)
+    and notify admins through the outbox"""
+    order = await load_order(db, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
-    new_status = status_update.get("status")
-    if new_status:
-        order.status = new_status
-        if new_status in ["accepted", "preparing"]:
-            order.estimated_time = status_update.get("estimated_time", 30)
+    current_status, new_status = order.status, status_update.status
+    if new_status == current_status:
+        return FastJSONResponse(await load_order_data(db, order_id))
+    if not can_transition(current_status, new_status):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Cannot change order status from '{current_status}' to '{new_status}'"
+        )
 
-        db.commit()
-        db.refresh(order)
+    # Cancelling removes the order from the analytics rollups, from the buckets of the
+    # categories its items were counted under
+    if new_status == "cancelled":
+        await apply_rollups(db, [order_entry(order)], sign=-1)
 
-        # Notify admins of status change
-        await manager.notify_order_status_change(order_id, new_status)
+    values = {"status": new_status}
+    if new_status in ["accepted", "preparing"]:
+        values["estimated_time"] = status_update.estimated_time if status_update.estimated_time is not None else 30
 
-    return order
+    # Only apply the transition if nobody changed the status since it was read
+    result = await db.execute(
+        update(OrderModel)
+        .where(OrderModel.id == order_id, OrderModel.status == current_status)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Order status was changed concurrently")
+
+    # Record the admin notification atomically with the status change
+    enqueue_event(db, {
+        "type": "order_status_change",
+        "data": {"order_id": order_id, "status": new_status, "estimated_time": values.get("estimated_time")},
+    }, key=("order_status", order_id))
+
+    await db.commit()
+    dispatcher.wake()
+    active_orders.set_status(order_id, new_status, values.get("estimated_time"))
+    return FastJSONResponse(await load_order_data(db, order_id))
@@ -1,13 +1,97 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import json
+import stripe
+from ..dependencies import get_db
+from app.core.branches import BRANCHES, current_branch, use_branch
+from app.core.database import AsyncSessionLocal
+from app.core.payments import (
+    PAYMENT_CURRENCY, STRIPE_SECRET_KEY, STRIPE_WEBHOOK_SECRET, STRIPE_WEBHOOK_TOLERANCE,
+    processor, record_payment_event,
+)
+from app.models import Order as OrderModel
+from app.schemas import PaymentIntentCreate, PaymentIntent, WebhookReceipt
 
 router = APIRouter()
 
-@router.post("/stripe/webhook")
-async def stripe_webhook():
-    """Handle Stripe webhooks for payment confirmations"""
-    return {"message": "Stripe webhook endpoint - TODO: Implement webhook handling"}
+@router.post("/stripe/webhook", response_model=WebhookReceipt)
+async def stripe_webhook(
+    request: Request,
+    stripe_signature: Optional[str] = Header(None),
+):
+    """Handle Stripe webhooks for payment confirmations.
 
-@router.post("/create-payment-intent")
-async def create_payment_intent():
-    """Create Stripe payment intent"""
-    return {"message": "Create payment intent - TODO: Integrate with Stripe API"}
+    Only the signature is checked inline; the raw event is queued under its
+    event id (redeliveries are acknowledged without being queued twice) and
+    applied to the order by the payment worker pool. One Stripe account
+    serves every branch, so the event is queued in the branch named in its
+    payment intent's metadata.
+    """
+    if not STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Stripe webhooks are not configured")
+
+    payload = (await request.body()).decode("utf-8")
+    try:
+        stripe.WebhookSignature.verify_header(
+            payload, stripe_signature or "", STRIPE_WEBHOOK_SECRET, STRIPE_WEBHOOK_TOLERANCE
+        )
+        event = json.loads(payload)
+        event_id, event_type = event["id"], event["type"]
+        metadata = event.get("data", {}).get("object", {}).get("metadata") or {}
+        branch = metadata.get("branch") or current_branch.get()
+    except stripe.error.SignatureVerificationError:
+        raise HTTPException(status_code=400, detail="Invalid signature")
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+    if branch not in BRANCHES:
+        # Not ours (another deployment on the same account): acknowledge so Stripe stops retrying
+        print(f"Ignoring Stripe event {event_id} for unknown branch '{branch}'")
+        return {"received": True, "duplicate": False}
+
+    with use_branch(branch):
+        async with AsyncSessionLocal() as db:
+            queued = await record_payment_event(db, event_id, event_type, payload)
+        if queued:
+            processor.wake()
+    return {"received": True, "duplicate": not queued}
+
+@router.post("/create-payment-intent", response_model=PaymentIntent)
+async def create_payment_intent(payment: PaymentIntentCreate, db: AsyncSession = Depends(get_db)):
+    """Create Stripe payment intent for an order's server-side total"""
+    if not STRIPE_SECRET_KEY:
+        raise HTTPException(status_code=503, detail="Stripe is not configured")
+
+    order = await db.get(OrderModel, payment.order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order.payment_status == "paid":
+        raise HTTPException(status_code=400, detail="Order is already paid")
+
+    try:
+        intent = await run_in_threadpool(
+            stripe.PaymentIntent.create,
+            api_key=STRIPE_SECRET_KEY,
+            # Retrying for the same order reuses the intent instead of charging twice; order ids
+            # repeat across branches sharing the Stripe account
+            idempotency_key=f"{current_branch.get()}-order-{order.id}-{order.total_amount}",
+            amount=order.total_amount,
+            currency=PAYMENT_CURRENCY,
+            metadata={"order_id": str(order.id), "branch": current_branch.get()},
+        )
+    except stripe.error.StripeError as e:
+        raise HTTPException(status_code=502, detail=f"Payment provider error: {e.user_message or e}")
+
+    order.payment_intent_id = intent.id
+    order.payment_status = "requires_payment"
+    await db.commit()
+
+    return {
+        "order_id": order.id,
+        "payment_intent_id": intent.id,
+        "client_secret": intent.client_secret,
+        "amount": order.total_amount,
+        "currency": PAYMENT_CURRENCY,
+    }
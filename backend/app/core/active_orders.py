@@ -0,0 +1,112 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.branches import BranchLocal
+
+# Allowed status transitions; delivered and cancelled orders are closed for good
+ORDER_TRANSITIONS = {
+    "pending": {"accepted", "cancelled"},
+    "accepted": {"preparing", "cancelled"},
+    "preparing": {"ready", "cancelled"},
+    "ready": {"delivered", "cancelled"},
+    "delivered": set(),
+    "cancelled": set(),
+}
+ORDER_STATUSES = list(ORDER_TRANSITIONS)
+OPEN_STATUSES = [status for status, targets in ORDER_TRANSITIONS.items() if targets]
+
+
+def can_transition(current: str, new: str) -> bool:
+    return new in ORDER_TRANSITIONS.get(current, ())
+
+
+class ActiveOrderIndex:
+    """Process-local index of open orders for the kitchen board.
+
+    Orders are kept per status, oldest first, as the same payload admins are
+    notified with. Reads cost O(open orders) however long the order history
+    grows. Writes come from the order endpoints of this process and, through
+    the admin event bus, from every other worker; applying an event twice is
+    harmless.
+    """
+
+    def __init__(self):
+        self._orders: Dict[int, Dict] = {}
+        self._keys: Dict[str, List[Tuple[str, int]]] = {status: [] for status in OPEN_STATUSES}
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __contains__(self, order_id: int):
+        return order_id in self._orders
+
+    @staticmethod
+    def _key(order: Dict) -> Tuple[str, int]:
+        return order["created_at"], order["id"]
+
+    def load(self, orders: Iterable[Dict]):
+        """Replace the index with the given open orders"""
+        self._orders = {}
+        self._keys = {status: [] for status in OPEN_STATUSES}
+        for order in orders:
+            self.add(order)
+        self.loaded = True
+
+    def add(self, order: Dict):
+        """Track a new order (a notification payload); closed orders are ignored"""
+        if order["id"] in self._orders:
+            self.remove(order["id"])
+        if order["status"] not in self._keys:
+            return
+        self._orders[order["id"]] = order
+        insort(self._keys[order["status"]], self._key(order))
+
+    def remove(self, order_id: int) -> Optional[Dict]:
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            keys = self._keys[order["status"]]
+            del keys[bisect_left(keys, self._key(order))]
+        return order
+
+    def set_status(self, order_id: int, status: str, estimated_time: Optional[int] = None):
+        """Move a tracked order to another status, dropping it once closed"""
+        order = self.remove(order_id)
+        if order is None:
+            return
+        order["status"] = status
+        if estimated_time is not None:
+            order["estimated_time"] = estimated_time
+        self.add(order)
+
+    def get(self, order_id: int) -> Optional[Dict]:
+        return self._orders.get(order_id)
+
+    def orders(self, status: Optional[str] = None) -> List[Dict]:
+        """Open orders, oldest first, optionally for one status"""
+        if status is not None:
+            return [self._orders[order_id] for _, order_id in self._keys.get(status, [])]
+        return sorted(self._orders.values(), key=self._key)
+
+    def board(self, statuses: Iterable[str] = OPEN_STATUSES) -> Dict:
+        """Open orders grouped by status, oldest first, with counts"""
+        return {
+            "counts": {status: len(self._keys[status]) for status in statuses},
+            "orders": {status: self.orders(status) for status in statuses},
+        }
+
+    def apply_event(self, message: Dict):
+        """Keep the index current from admin notifications published by any worker"""
+        event_type = message.get("type")
+        data = message.get("data") or {}
+        if event_type == "new_order":
+            self.add(dict(data))
+        elif event_type == "new_orders_batch":
+            for order in data.get("orders", []):
+                self.add(dict(order))
+        elif event_type == "order_status_change":
+            self.set_status(data["order_id"], data["status"], data.get("estimated_time"))
+
+
+# Index of each branch's open orders, loaded on startup
+active_orders = BranchLocal(ActiveOrderIndex)
@@ -0,0 +1,204 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+from decouple import config
+
+from app.core.branches import BranchLocal, current_branch
+from app.core.metrics import registry
+
+# Write requests handled at once across both lanes; SQLite has a single writer anyway
+ADMISSION_WRITE_CONCURRENCY = config('ADMISSION_WRITE_CONCURRENCY', default=4, cast=int)
+# Slots customer writes may never take, so kitchen and menu updates always get through
+ADMISSION_ADMIN_RESERVED = config('ADMISSION_ADMIN_RESERVED', default=1, cast=int)
+# New customer writes are shed while recent ones waited longer than this many ms for a slot
+ADMISSION_QUEUE_TARGET_MS = config('ADMISSION_QUEUE_TARGET_MS', default=250, cast=float)
+# Queued customer writes give up after this many ms
+ADMISSION_QUEUE_TIMEOUT_MS = config('ADMISSION_QUEUE_TIMEOUT_MS', default=1000, cast=float)
+# Requests waiting per lane before new ones are turned away outright
+ADMISSION_CUSTOMER_QUEUE = config('ADMISSION_CUSTOMER_QUEUE', default=100, cast=int)
+ADMISSION_ADMIN_QUEUE = config('ADMISSION_ADMIN_QUEUE', default=50, cast=int)
+# Per-client token buckets for customer writes: sustained requests per second and burst size
+ADMISSION_CLIENT_RATE = config('ADMISSION_CLIENT_RATE', default=2.0, cast=float)
+ADMISSION_CLIENT_BURST = config('ADMISSION_CLIENT_BURST', default=10, cast=int)
+# Clients tracked at once; the least recently seen bucket is dropped first
+ADMISSION_MAX_CLIENTS = config('ADMISSION_MAX_CLIENTS', default=10000, cast=int)
+# Use the first X-Forwarded-For address as the client (only behind a trusted proxy)
+ADMISSION_TRUST_FORWARDED = config('ADMISSION_TRUST_FORWARDED', default=False, cast=bool)
+
+ADMIN = "admin"
+CUSTOMER = "customer"
+LANES = (ADMIN, CUSTOMER)  # highest priority first
+
+IN_FLIGHT = registry.gauge("admission_in_flight", "Write requests being handled, by branch and lane",
+                           ["branch", "lane"])
+QUEUE_DEPTH = registry.gauge("admission_queue_depth", "Write requests waiting for a slot, by branch and lane",
+                             ["branch", "lane"])
+QUEUE_WAIT = registry.histogram("admission_queue_wait_seconds", "Time admitted write requests waited for a slot",
+                                ["lane"])
+REJECTED = registry.counter("admission_rejected_total", "Requests turned away by admission control",
+                            ["lane", "reason"])
+
+
+class Rejected(Exception):
+    """A request turned away; ``retry_after`` is a hint in whole seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBuckets:
+    """Token bucket per client, refilled lazily on each request.
+
+    Buckets live in an LRU dict bounded by ``max_clients``; a dropped
+    bucket comes back full, which only matters for clients idle long
+    enough to have refilled anyway.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # client -> [tokens, updated]
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, client: str, now: Optional[float] = None) -> float:
+        """Take a token for ``client``: 0 if granted, else seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [float(self.burst), now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+
+class WriteLimiter:
+    """Bounds concurrent write requests, admitting waiters by lane priority.
+
+    Admin requests are served before any waiting customer request, and
+    customers can only use ``limit - reserved`` slots. Waiters are woken in
+    FIFO order within a lane. Customer load is shed on queue wait rather
+    than queue length: while the moving average wait of recently admitted
+    customer requests is above ``target``, new arrivals that would have to
+    queue get a fast rejection, and a queued request gives up after
+    ``timeout``. Admin requests are only bounded by their queue length.
+    """
+
+    def __init__(self, limit: int, reserved: int, target: float, timeout: float, max_queue: Dict[str, int]):
+        self.limit = limit
+        self.reserved = min(reserved, limit - 1)
+        self.target = target
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self.in_flight: Dict[str, int] = {lane: 0 for lane in LANES}
+        self.queues: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        # Moving average of the queue wait of admitted requests, per lane
+        self.queue_wait: Dict[str, float] = {lane: 0.0 for lane in LANES}
+        self.branch = current_branch.get()
+
+    def _has_slot(self, lane: str) -> bool:
+        slots = self.limit if lane == ADMIN else self.limit - self.reserved
+        return sum(self.in_flight.values()) < slots
+
+    def retry_after(self, lane: str) -> int:
+        return max(1, math.ceil(self.queue_wait[lane]))
+
+    def _report(self, lane: str):
+        IN_FLIGHT.set(self.in_flight[lane], branch=self.branch, lane=lane)
+        QUEUE_DEPTH.set(len(self.queues[lane]), branch=self.branch, lane=lane)
+
+    def _admitted(self, lane: str, waited: float):
+        self.queue_wait[lane] += 0.1 * (waited - self.queue_wait[lane])
+        QUEUE_WAIT.observe(waited, lane=lane)
+
+    def _reject(self, lane: str, reason: str):
+        REJECTED.inc(lane=lane, reason=reason)
+        return Rejected(reason, self.retry_after(lane))
+
+    async def acquire(self, lane: str):
+        """Wait for a write slot in ``lane``; raises Rejected when shedding load"""
+        ahead_waiting = any(self.queues[name] for name in LANES[:LANES.index(lane) + 1])
+        if not ahead_waiting and self._has_slot(lane):
+            self.in_flight[lane] += 1
+            self._report(lane)
+            self._admitted(lane, 0.0)
+            return
+        if len(self.queues[lane]) >= self.max_queue[lane]:
+            raise self._reject(lane, "queue_full")
+        if lane != ADMIN and self.queue_wait[lane] > self.target:
+            raise self._reject(lane, "overloaded")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.queues[lane].append(waiter)
+        self._report(lane)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, None if lane == ADMIN else self.timeout)
+        except asyncio.TimeoutError:
+            self._admitted(lane, time.monotonic() - started)
+            raise self._reject(lane, "timeout")
+        except asyncio.CancelledError:
+            # Cancelled just after being handed a slot: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release(lane)
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self.queues[lane].remove(waiter)
+                except ValueError:
+                    pass
+            self._report(lane)
+        self._admitted(lane, time.monotonic() - started)
+
+    def release(self, lane: str):
+        """Free a slot and admit the next waiters by priority"""
+        self.in_flight[lane] -= 1
+        self._report(lane)
+        for name in LANES:
+            queue = self.queues[name]
+            while queue and self._has_slot(name):
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self.in_flight[name] += 1
+                waiter.set_result(None)
+                self._report(name)
+            if queue:
+                # Lower lanes never overtake a waiting higher one
+                break
+
+
+def admit_client(client: str):
+    """Charge a customer write to ``client``'s token bucket; raises Rejected once it is empty"""
+    wait = client_buckets.take(client)
+    if wait:
+        REJECTED.inc(lane=CUSTOMER, reason="rate_limited")
+        raise Rejected("rate_limited", math.ceil(wait))
+
+
+# Admission state for write endpoints; branches write to separate databases, so each gets its own limiter
+client_buckets = TokenBuckets(ADMISSION_CLIENT_RATE, ADMISSION_CLIENT_BURST, ADMISSION_MAX_CLIENTS)
+write_limiter = BranchLocal(lambda: WriteLimiter(
+    ADMISSION_WRITE_CONCURRENCY,
+    ADMISSION_ADMIN_RESERVED,
+    ADMISSION_QUEUE_TARGET_MS / 1000,
+    ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+    {ADMIN: ADMISSION_ADMIN_QUEUE, CUSTOMER: ADMISSION_CUSTOMER_QUEUE},
+))
+
+registry.gauge("admission_tracked_clients", "Clients with a customer write token bucket",
+               function=lambda: len(client_buckets))
@@ -0,0 +1,99 @@
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Generic, Iterator, List, Optional, TypeVar
+from urllib.parse import parse_qs
+from decouple import Csv, config
+from starlette.responses import JSONResponse
+
+# Restaurant branches served by this deployment; the first is the default
+# for requests that do not name one and keeps the configured DATABASE_URL
+BRANCHES: List[str] = config('BRANCHES', default='main', cast=Csv())
+DEFAULT_BRANCH = BRANCHES[0]
+# Header naming the branch of a request; WebSockets and webhooks may use ?branch= instead
+BRANCH_HEADER = config('BRANCH_HEADER', default='X-Branch-ID')
+
+BRANCH_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,31}$")
+for _branch in BRANCHES:
+    if not BRANCH_RE.match(_branch):
+        raise ValueError(f"Invalid branch id '{_branch}': use lowercase letters, digits, '-' and '_'")
+
+# Branch the current request, task or script works on
+current_branch: ContextVar[str] = ContextVar("current_branch", default=DEFAULT_BRANCH)
+
+
+@contextmanager
+def use_branch(branch: str) -> Iterator[str]:
+    """Run the block (and tasks created in it) against ``branch``"""
+    token = current_branch.set(branch)
+    try:
+        yield branch
+    finally:
+        current_branch.reset(token)
+
+
+T = TypeVar("T")
+
+
+class BranchLocal(Generic[T]):
+    """One instance of a per-process service per branch, like threading.local.
+
+    Attribute access is forwarded to the instance of the current branch,
+    created by ``factory`` on first use inside that branch's context, so
+    module-level singletons (``catalog``, ``manager``...) stay importable
+    and call sites stay unchanged.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instances: Dict[str, T] = {}
+
+    def instance(self, branch: Optional[str] = None) -> T:
+        """Instance of ``branch``, the current one by default (not ``get``, which the wrapped types use)"""
+        branch = branch or current_branch.get()
+        instance = self._instances.get(branch)
+        if instance is None:
+            with use_branch(branch):
+                instance = self._instances[branch] = self._factory()
+        return instance
+
+    def instances(self) -> List[T]:
+        """Instances created so far, for metrics and shutdown"""
+        return list(self._instances.values())
+
+    def __getattr__(self, name):
+        return getattr(self.instance(), name)
+
+    def __len__(self):
+        return len(self.instance())
+
+
+class BranchMiddleware:
+    """Sets ``current_branch`` from the branch header or ``?branch=`` for every HTTP and WebSocket request"""
+
+    def __init__(self, app):
+        self.app = app
+        self.header = BRANCH_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        branch = None
+        for name, value in scope.get("headers", ()):
+            if name == self.header:
+                branch = value.decode("latin-1").strip()
+                break
+        if branch is None:
+            branch = (parse_qs(scope.get("query_string", b"").decode("latin-1")).get("branch") or [None])[0]
+        branch = branch or DEFAULT_BRANCH
+
+        if branch not in BRANCHES:
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 4404})
+            else:
+                await JSONResponse({"detail": f"Unknown branch '{branch}'"}, status_code=404)(scope, receive, send)
+            return
+        with use_branch(branch):
+            await self.app(scope, receive, send)
@@ -0,0 +1,103 @@
+import json
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.branches import BranchLocal
+
+# Upper bound on cached (filter, skip, limit) response bodies per snapshot
+MAX_CACHED_BODIES = 256
+
+
+class MenuCatalog:
+    """Process-local, pre-serialized snapshot of the menu.
+
+    The snapshot is keyed by a monotonically increasing version that every
+    menu write bumps. Readers compare versions instead of querying the
+    database, so an unchanged menu is served straight from memory. Writes
+    made by other workers bump it through ``menu_changed`` events on the
+    event bus.
+    """
+
+    def __init__(self):
+        self.version = 0
+        # Distinguishes versions handed out by different processes/restarts
+        self._epoch = uuid.uuid4().hex[:8]
+        self._snapshot_version: Optional[int] = None
+        self._items: Dict[int, Dict] = {}
+        self._rows: Dict[Tuple[Optional[str], bool], List[Dict]] = {}
+        self._bodies: Dict[Tuple[Optional[str], bool, int, int], bytes] = {}
+
+    @property
+    def epoch(self) -> str:
+        return self._epoch
+
+    def etag(self, version: Optional[int] = None) -> str:
+        if version is None:
+            version = self.version
+        return f'W/"menu-{self._epoch}-{version}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Check an If-None-Match header against the current menu version"""
+        if not if_none_match:
+            return False
+        current = self.etag()
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag == current:
+                return True
+        return False
+
+    def bump_version(self):
+        """Invalidate the snapshot after a menu write has been committed"""
+        self.version += 1
+
+    def is_fresh(self) -> bool:
+        return self._snapshot_version == self.version
+
+    def load(self, menu_items: Iterable[Dict], version: int):
+        """Build a snapshot from serialized menu items read at ``version``.
+
+        ``version`` must be captured before the rows were queried so that a
+        write racing with the load leaves the snapshot marked stale.
+        """
+        items = {}
+        rows: Dict[Tuple[Optional[str], bool], List[Dict]] = {(None, False): [], (None, True): []}
+        for data in menu_items:
+            items[data["id"]] = data
+            rows[(None, False)].append(data)
+            rows.setdefault((data["category"], False), []).append(data)
+            rows.setdefault((data["category"], True), [])
+            if data["available"]:
+                rows[(None, True)].append(data)
+                rows[(data["category"], True)].append(data)
+
+        self._items = items
+        self._rows = rows
+        self._bodies = {}
+        self._snapshot_version = version
+
+    def get_items(self, menu_item_ids) -> Optional[Dict[int, Dict]]:
+        """Resolve serialized menu items by id, or ``None`` if the snapshot is stale"""
+        if not self.is_fresh():
+            return None
+        return {item_id: self._items[item_id] for item_id in menu_item_ids if item_id in self._items}
+
+    def render(self, category: Optional[str], available_only: bool, skip: int, limit: int) -> bytes:
+        """Return the JSON body for a menu listing from the current snapshot"""
+        key = (category, available_only, skip, limit)
+        body = self._bodies.get(key)
+        if body is None:
+            rows = self._rows.get((category, available_only), [])
+            body = json.dumps(rows[skip:skip + limit], separators=(",", ":")).encode("utf-8")
+            if len(self._bodies) >= MAX_CACHED_BODIES:
+                self._bodies.clear()
+            self._bodies[key] = body
+        return body
+
+    @property
+    def snapshot_version(self) -> Optional[int]:
+        return self._snapshot_version
+
+
+# Menu catalog of each branch
+catalog = BranchLocal(MenuCatalog)
@@ -0,0 +1,171 @@
+from typing import Awaitable, Callable, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from decouple import config
+from sqlalchemy import delete, func, or_, select
+import asyncio
+import json
+import uuid
+
+from app.core.database import AsyncSessionLocal
+from app.models import BusEvent
+
+# 'memory' keeps events in this process; 'database' shares them between workers
+EVENT_BUS_BACKEND = config('EVENT_BUS_BACKEND', default='memory')
+# Seconds between polls of the bus_events table
+EVENT_BUS_POLL_INTERVAL = config('EVENT_BUS_POLL_INTERVAL', default=0.2, cast=float)
+# Seconds published events are kept for workers to pick up
+EVENT_BUS_RETENTION = config('EVENT_BUS_RETENTION', default=300, cast=int)
+EVENT_BUS_BATCH_SIZE = 500
+# Seconds a skipped event id is re-read for: on Postgres, transactions can commit their ids out of order
+EVENT_BUS_GAP_TIMEOUT = config('EVENT_BUS_GAP_TIMEOUT', default=10, cast=float)
+# Skipped ids tracked at once; the oldest are given up first
+EVENT_BUS_MAX_GAPS = 1000
+
+Handler = Callable[[Dict, Optional[tuple]], Awaitable[None]]
+
+
+class EventBus:
+    """Pub/sub backend that delivers admin notifications to every worker.
+
+    ``handler`` is called with ``(message, key)`` for each event in every
+    process subscribed to the bus, including the publishing one.
+    """
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, message: Dict, key: Optional[tuple] = None):
+        raise NotImplementedError
+
+
+class InProcessEventBus(EventBus):
+    """Delivers events only to the current process"""
+
+    async def publish(self, message: Dict, key: Optional[tuple] = None):
+        await self.handler(message, key)
+
+
+class DatabaseEventBus(EventBus):
+    """Shares events between processes through the bus_events table.
+
+    Events are delivered locally right away and inserted for the other
+    workers, which poll for rows newer than the last id they have seen.
+    Ids are allocated when a transaction inserts but become visible when it
+    commits, so a poll can see id 12 before id 11 exists: ids skipped over
+    are kept as gaps and re-read until they show up or ``gap_timeout``
+    passes (rolled back inserts leave gaps that never fill). Works on any
+    database the app can write to, SQLite included.
+    """
+
+    def __init__(self, handler: Handler, session_factory=AsyncSessionLocal,
+                 poll_interval: float = EVENT_BUS_POLL_INTERVAL,
+                 retention: int = EVENT_BUS_RETENTION,
+                 gap_timeout: float = EVENT_BUS_GAP_TIMEOUT):
+        super().__init__(handler)
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.gap_timeout = gap_timeout
+        self.node_id = uuid.uuid4().hex
+        self.last_id = 0
+        # Skipped ids not yet visible -> loop time after which they are given up
+        self.gaps: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        async with self.session_factory() as db:
+            result = await db.execute(select(func.max(BusEvent.id)))
+            self.last_id = result.scalar() or 0
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, message: Dict, key: Optional[tuple] = None):
+        payload = json.dumps({"message": message, "key": list(key) if key else None})
+        async with self.session_factory() as db:
+            db.add(BusEvent(origin=self.node_id, payload=payload))
+            await db.commit()
+        await self.handler(message, key)
+
+    async def _poll(self):
+        last_prune = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            rows = []
+            try:
+                async with self.session_factory() as db:
+                    condition = BusEvent.id > self.last_id
+                    if self.gaps:
+                        condition = or_(condition, BusEvent.id.in_(list(self.gaps)))
+                    result = await db.execute(
+                        select(BusEvent.id, BusEvent.origin, BusEvent.payload)
+                        .where(condition)
+                        .order_by(BusEvent.id)
+                        .limit(EVENT_BUS_BATCH_SIZE)
+                    )
+                    rows = result.all()
+
+                    if loop.time() - last_prune > self.retention:
+                        last_prune = loop.time()
+                        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+                        await db.execute(delete(BusEvent).where(BusEvent.created_at < cutoff))
+                        await db.commit()
+
+                self._expire_gaps(loop.time())
+                for row in rows:
+                    if self.gaps.pop(row.id, None) is None:
+                        if row.id <= self.last_id:
+                            continue  # Already delivered
+                        self._skip_to(row.id, loop.time())
+                    if row.origin == self.node_id:
+                        continue
+                    event = json.loads(row.payload)
+                    key = tuple(event["key"]) if event["key"] else None
+                    await self.handler(event["message"], key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Event bus poll error: {e}")
+
+            if len(rows) < EVENT_BUS_BATCH_SIZE:
+                await asyncio.sleep(self.poll_interval)
+
+    def _skip_to(self, event_id: int, now: float):
+        """Advance past ``event_id``, remembering the ids in between as gaps"""
+        first_missing = max(self.last_id + 1, event_id - EVENT_BUS_MAX_GAPS)
+        for missing in range(first_missing, event_id):
+            self.gaps[missing] = now + self.gap_timeout
+        self.last_id = event_id
+        while len(self.gaps) > EVENT_BUS_MAX_GAPS:
+            del self.gaps[min(self.gaps)]
+
+    def _expire_gaps(self, now: float):
+        for missing in [missing for missing, deadline in self.gaps.items() if deadline <= now]:
+            del self.gaps[missing]
+
+
+EVENT_BUS_BACKENDS = {
+    'memory': InProcessEventBus,
+    'database': DatabaseEventBus,
+}
+
+def create_event_bus(handler: Handler, backend: str = EVENT_BUS_BACKEND) -> EventBus:
+    """Build the configured event bus backend"""
+    try:
+        bus_class = EVENT_BUS_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown event bus backend '{backend}'")
+    return bus_class(handler)
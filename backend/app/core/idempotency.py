@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from decouple import config
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.branches import BranchLocal
+from app.core.metrics import registry
+from app.models import IdempotencyRecord
+
+# Seconds a stored response is replayed for
+IDEMPOTENCY_TTL = config('IDEMPOTENCY_TTL', default=86400, cast=int)
+# Responses kept in memory; older ones are still found in the database
+IDEMPOTENCY_CACHE_SIZE = config('IDEMPOTENCY_CACHE_SIZE', default=10000, cast=int)
+# Seconds between deletes of expired keys from the database
+IDEMPOTENCY_PRUNE_INTERVAL = config('IDEMPOTENCY_PRUNE_INTERVAL', default=3600, cast=int)
+
+REPLAYS = registry.counter(
+    "idempotency_replays_total", "Responses replayed for a repeated Idempotency-Key, by where they came from",
+    ["source"])
+
+
+def scoped_key(scope: str, key: str) -> str:
+    """Storage key for a client's Idempotency-Key, so that clients never see each other's responses
+    (or learn that a key is in use); hashed to fit the column whatever the lengths"""
+    return hashlib.sha256(f"{scope}\n{key}".encode("utf-8")).hexdigest()
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status_code: int
+    body: bytes
+    expires_at: float  # time.time()
+
+
+class IdempotencyMismatch(Exception):
+    """An Idempotency-Key reused for a different request"""
+
+
+class IdempotencyCache:
+    """Runs a request once per Idempotency-Key and replays its response to retries.
+
+    Completed responses are kept in an in-memory LRU with a TTL in front of
+    the ``idempotency_keys`` table, which the executing request writes in
+    its own transaction so that the response is stored exactly when its
+    side effects commit. Concurrent requests with a key already being
+    executed in this process wait for that execution instead of starting
+    another; across processes the primary key on the table turns the
+    second commit into a replay.
+    """
+
+    def __init__(self, max_size: int = IDEMPOTENCY_CACHE_SIZE, ttl: int = IDEMPOTENCY_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._responses: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._last_prune = 0.0
+
+    def __len__(self):
+        return len(self._responses)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        response = self._responses.get(key)
+        if response is None:
+            return None
+        if response.expires_at <= time.time():
+            del self._responses[key]
+            return None
+        self._responses.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: StoredResponse):
+        self._responses[key] = response
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_size:
+            self._responses.popitem(last=False)
+
+    async def load(self, db: AsyncSession, key: str) -> Optional[StoredResponse]:
+        """Unexpired stored response from the database"""
+        row = (await db.execute(
+            select(IdempotencyRecord.fingerprint, IdempotencyRecord.status_code,
+                   IdempotencyRecord.body, IdempotencyRecord.created_at)
+            .filter(IdempotencyRecord.key == key)
+        )).first()
+        if row is None:
+            return None
+        expires_at = row.created_at.replace(tzinfo=timezone.utc).timestamp() + self.ttl
+        if expires_at <= time.time():
+            return None
+        return StoredResponse(row.fingerprint, row.status_code, row.body.encode("utf-8"), expires_at)
+
+    async def stage(self, db: AsyncSession, key: str, response: StoredResponse):
+        """Add the response to the caller's transaction, replacing an expired record of the key"""
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.ttl)
+        await db.execute(delete(IdempotencyRecord).where(
+            IdempotencyRecord.key == key, IdempotencyRecord.created_at < cutoff))
+        if time.monotonic() - self._last_prune > IDEMPOTENCY_PRUNE_INTERVAL:
+            self._last_prune = time.monotonic()
+            await db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.created_at < cutoff))
+        db.add(IdempotencyRecord(key=key, fingerprint=response.fingerprint, status_code=response.status_code,
+                                 body=response.body.decode("utf-8"), created_at=now))
+
+    def response(self, fingerprint: str, status_code: int, body: bytes) -> StoredResponse:
+        return StoredResponse(fingerprint, status_code, body, time.time() + self.ttl)
+
+    @staticmethod
+    def _check(response: StoredResponse, fingerprint: str) -> StoredResponse:
+        if response.fingerprint != fingerprint:
+            raise IdempotencyMismatch("Idempotency-Key was already used for a different request")
+        return response
+
+    async def run(self, db: AsyncSession, key: str, fingerprint: str,
+                  execute: Callable[[], Awaitable[StoredResponse]]) -> Tuple[StoredResponse, bool]:
+        """The response for ``key`` and whether it was replayed.
+
+        ``execute`` performs the request on ``db``, stages its response with
+        ``stage`` and commits. It runs at most once per key and process at
+        a time; its exceptions are raised to every request waiting on it
+        and nothing is stored, so a later retry executes again.
+        """
+        response = self.get(key)
+        if response is not None:
+            REPLAYS.inc(source="memory")
+            return self._check(response, fingerprint), True
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            try:
+                response = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The first request was cancelled (client went away): run it here instead
+                return await self.run(db, key, fingerprint, execute)
+            REPLAYS.inc(source="in_flight")
+            return self._check(response, fingerprint), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            replayed = True
+            response = await self.load(db, key)
+            if response is not None:
+                REPLAYS.inc(source="database")
+            else:
+                try:
+                    response = await execute()
+                    replayed = False
+                except IntegrityError:
+                    # Another process committed the same key first
+                    await db.rollback()
+                    response = await self.load(db, key)
+                    if response is None:
+                        raise
+                    REPLAYS.inc(source="database")
+            self.put(key, response)
+            future.set_result(response)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved here, so no warning when nobody else was waiting
+            raise
+        finally:
+            del self._in_flight[key]
+        return self._check(response, fingerprint), replayed
+
+
+# Order creation cache of each branch
+idempotency_cache = BranchLocal(IdempotencyCache)
+
+registry.gauge("idempotency_cached_responses", "Idempotency-Key responses held in memory",
+               function=lambda: sum(len(cache) for cache in idempotency_cache.instances()))
+registry.gauge("idempotency_in_flight", "Idempotency-Keys whose first request is still executing",
+               function=lambda: sum(cache.in_flight for cache in idempotency_cache.instances()))
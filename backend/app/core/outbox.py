@@ -0,0 +1,156 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+from decouple import config
+from sqlalchemy import delete, or_, select, update
+import asyncio
+import json
+import uuid
+
+from app.core.branches import BranchLocal
+from app.core.database import AsyncSessionLocal
+from app.core.websocket import manager
+from app.models import OutboxEvent
+
+# Seconds between outbox polls when no local write has signalled new events
+OUTBOX_POLL_INTERVAL = config('OUTBOX_POLL_INTERVAL', default=1.0, cast=float)
+# Events claimed and published per round trip
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=100, cast=int)
+# Seconds after which a claimed but undelivered event is retried (e.g. its worker died)
+OUTBOX_CLAIM_TIMEOUT = config('OUTBOX_CLAIM_TIMEOUT', default=30, cast=int)
+# Seconds delivered events are kept before being pruned
+OUTBOX_RETENTION = config('OUTBOX_RETENTION', default=3600, cast=int)
+
+Publisher = Callable[[Dict, Optional[tuple]], Awaitable[None]]
+
+
+def enqueue_event(db, message: Dict, key: Optional[tuple] = None):
+    """Record a notification in the caller's transaction; it is published once committed"""
+    payload = json.dumps({"message": message, "key": list(key) if key else None})
+    db.add(OutboxEvent(payload=payload))
+
+
+class OutboxDispatcher:
+    """Drains the outbox_events table into the event bus in the background.
+
+    Writers call ``wake()`` after committing so local events go out right
+    away; the poll interval picks up events committed by other workers and
+    anything left behind by a crash. Rows are claimed before publishing, so
+    several workers can share one outbox and each event is published once
+    (or again after OUTBOX_CLAIM_TIMEOUT if its dispatcher died mid-batch).
+    """
+
+    def __init__(self, publish: Publisher, session_factory=AsyncSessionLocal,
+                 poll_interval: float = OUTBOX_POLL_INTERVAL, batch_size: int = OUTBOX_BATCH_SIZE):
+        self.publish = publish
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.delivered = 0
+        self.failed = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Signal that events were committed; never blocks the caller"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        last_prune = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            try:
+                while await self.dispatch_batch() == self.batch_size:
+                    pass
+                if loop.time() - last_prune > OUTBOX_RETENTION:
+                    last_prune = loop.time()
+                    await self.prune()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Outbox dispatch error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, db) -> List[OutboxEvent]:
+        claim = uuid.uuid4().hex
+        now = datetime.utcnow()
+        claimable = or_(
+            OutboxEvent.claimed_at.is_(None),
+            OutboxEvent.claimed_at < now - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT),
+        )
+        pending = (
+            select(OutboxEvent.id)
+            .where(OutboxEvent.delivered_at.is_(None), claimable)
+            .order_by(OutboxEvent.id)
+            .limit(self.batch_size)
+        )
+        # The claim condition is repeated on the outer statement so a concurrent
+        # dispatcher that picked the same ids skips rows claimed in the meantime
+        await db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(pending.scalar_subquery()), claimable)
+            .values(claimed_by=claim, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        result = await db.execute(
+            select(OutboxEvent.id, OutboxEvent.payload)
+            .where(OutboxEvent.claimed_by == claim)
+            .order_by(OutboxEvent.id)
+        )
+        return result.all()
+
+    async def dispatch_batch(self) -> int:
+        """Claim, publish and mark delivered one batch; returns how many rows were claimed"""
+        async with self.session_factory() as db:
+            rows = await self._claim(db)
+            published = []
+            try:
+                for row in rows:
+                    event = json.loads(row.payload)
+                    key = tuple(event["key"]) if event["key"] else None
+                    await self.publish(event["message"], key)
+                    published.append(row.id)
+            except Exception as e:
+                # Unpublished rows stay claimed and are retried after the claim timeout
+                self.failed += len(rows) - len(published)
+                print(f"Outbox publish error: {e}")
+            finally:
+                if published:
+                    await db.execute(
+                        update(OutboxEvent)
+                        .where(OutboxEvent.id.in_(published))
+                        .values(delivered_at=datetime.utcnow())
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+                    self.delivered += len(published)
+            return len(rows)
+
+    async def prune(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=OUTBOX_RETENTION)
+        async with self.session_factory() as db:
+            await db.execute(delete(OutboxEvent).where(OutboxEvent.delivered_at < cutoff))
+            await db.commit()
+
+
+# Dispatcher of each branch, publishing committed order events to that branch's admin event bus
+dispatcher = BranchLocal(lambda: OutboxDispatcher(manager.bus.publish))
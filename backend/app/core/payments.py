@@ -0,0 +1,282 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from decouple import config
+from sqlalchemy import bindparam, func, or_, select, update
+import asyncio
+import json
+import uuid
+
+from app.core.branches import BranchLocal
+from app.core.database import AsyncSessionLocal
+from app.core.outbox import dispatcher, enqueue_event
+from app.crud.rollups import UPSERTS
+from app.models import ArchivedOrder, Order, PaymentEvent
+
+STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
+STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
+# Seconds a webhook signature timestamp may lag behind before the event is rejected
+STRIPE_WEBHOOK_TOLERANCE = config('STRIPE_WEBHOOK_TOLERANCE', default=300, cast=int)
+PAYMENT_CURRENCY = config('PAYMENT_CURRENCY', default='inr')
+# Worker tasks processing queued payment events
+PAYMENT_WORKERS = config('PAYMENT_WORKERS', default=2, cast=int)
+# Events claimed and applied per transaction
+PAYMENT_BATCH_SIZE = config('PAYMENT_BATCH_SIZE', default=200, cast=int)
+# Seconds between queue polls when no webhook has signalled new events
+PAYMENT_POLL_INTERVAL = config('PAYMENT_POLL_INTERVAL', default=1.0, cast=float)
+# Seconds after which a claimed but unprocessed event is retried
+PAYMENT_CLAIM_TIMEOUT = config('PAYMENT_CLAIM_TIMEOUT', default=60, cast=int)
+# Claims after which an event that keeps failing is given up on
+PAYMENT_MAX_ATTEMPTS = config('PAYMENT_MAX_ATTEMPTS', default=5, cast=int)
+
+# Order payment status set by each provider event type, with its precedence
+# among events stamped in the same second; other types are ignored
+PAYMENT_STATUSES = {
+    "payment_intent.processing": ("processing", 0),
+    "payment_intent.payment_failed": ("failed", 1),
+    "payment_intent.canceled": ("cancelled", 1),
+    "payment_intent.succeeded": ("paid", 2),
+    "charge.refunded": ("refunded", 3),
+}
+
+
+async def record_payment_event(db, event_id: str, event_type: str, payload: str) -> bool:
+    """Queue a verified event; False if the event id was already recorded"""
+    stmt = UPSERTS[db.get_bind().dialect.name](PaymentEvent.__table__).values(
+        event_id=event_id, event_type=event_type, payload=payload, status="pending", attempts=0,
+    ).on_conflict_do_nothing(index_elements=["event_id"])
+    result = await db.execute(stmt)
+    await db.commit()
+    return result.rowcount > 0
+
+
+def payment_target(event: Dict) -> Tuple[Optional[int], Optional[str]]:
+    """(order id, payment intent id) an event refers to, either may be unknown"""
+    obj = event.get("data", {}).get("object", {})
+    if obj.get("object") == "payment_intent":
+        intent_id = obj.get("id")
+    else:
+        intent_id = obj.get("payment_intent")
+    order_id = (obj.get("metadata") or {}).get("order_id")
+    try:
+        order_id = int(order_id) if order_id is not None else None
+    except (TypeError, ValueError):
+        order_id = None
+    return order_id, intent_id
+
+
+async def apply_payment_events(db, rows) -> Dict[int, str]:
+    """Apply a batch of claimed events to their orders in one transaction.
+
+    Providers deliver out of order, so each order remembers the version
+    (event time and precedence) of the last event applied to it and older
+    events no longer change its status. Returns the payment status of every
+    order the batch touched.
+    """
+    events = []
+    for row in rows:
+        event = json.loads(row.payload)
+        events.append((row.id, event, payment_target(event)))
+
+    order_ids = {order_id for _, _, (order_id, _) in events if order_id is not None}
+    intent_ids = {intent_id for _, _, (_, intent_id) in events if intent_id is not None}
+    # Order id -> model of the table holding it; refunds and disputes can arrive
+    # long after the order was moved to the archive
+    known_orders = {}
+    orders_by_intent = {}
+    for model in (Order, ArchivedOrder):
+        if not order_ids and not intent_ids:
+            break
+        result = await db.execute(
+            select(model.id, model.payment_intent_id)
+            .filter(or_(model.id.in_(order_ids), model.payment_intent_id.in_(intent_ids)))
+        )
+        for order_id, intent_id in result.all():
+            known_orders.setdefault(order_id, model)
+            if intent_id:
+                orders_by_intent.setdefault(intent_id, order_id)
+        order_ids = order_ids - set(known_orders)
+        intent_ids = intent_ids - set(orders_by_intent)
+
+    now = datetime.utcnow()
+    order_updates: Dict[int, Dict] = {}
+    event_updates = []
+    for row_id, event, (order_id, intent_id) in events:
+        if event.get("type") not in PAYMENT_STATUSES:
+            event_updates.append({"id": row_id, "status": "ignored", "error": None, "processed_at": now})
+            continue
+
+        if order_id not in known_orders:
+            order_id = orders_by_intent.get(intent_id)
+        if order_id is None:
+            event_updates.append({"id": row_id, "status": "failed", "error": "Order not found", "processed_at": now})
+            continue
+
+        status, precedence = PAYMENT_STATUSES[event["type"]]
+        version = int(event.get("created") or 0) * 10 + precedence
+        current = order_updates.get(order_id)
+        if current is None or version >= current["new_version"]:
+            order_updates[order_id] = {
+                "order_id": order_id, "new_status": status, "new_version": version,
+                "new_intent_id": intent_id,
+            }
+        event_updates.append({"id": row_id, "status": "processed", "error": None, "processed_at": now})
+
+    statuses = {}
+    for model in (Order, ArchivedOrder):
+        updates = [values for order_id, values in order_updates.items() if known_orders[order_id] is model]
+        if not updates:
+            continue
+        order_table = model.__table__
+        await db.execute(
+            update(order_table)
+            .where(
+                order_table.c.id == bindparam("order_id"),
+                or_(order_table.c.payment_version.is_(None),
+                    order_table.c.payment_version <= bindparam("new_version")),
+            )
+            .values(
+                payment_status=bindparam("new_status"),
+                payment_version=bindparam("new_version"),
+                payment_intent_id=func.coalesce(bindparam("new_intent_id"), order_table.c.payment_intent_id),
+            ),
+            updates,
+        )
+        result = await db.execute(
+            select(model.id, model.payment_status).filter(model.id.in_([values["order_id"] for values in updates]))
+        )
+        statuses.update(result.all())
+    for order_id, payment_status in statuses.items():
+        enqueue_event(db, {
+            "type": "payment_status_change",
+            "data": {"order_id": order_id, "payment_status": payment_status},
+        }, key=("payment_status", order_id))
+    if event_updates:
+        await db.execute(update(PaymentEvent), event_updates)
+    await db.commit()
+    return statuses
+
+
+class PaymentProcessor:
+    """Bounded pool of workers applying queued payment events to orders.
+
+    The webhook only verifies and records events, then calls ``wake()``. Each
+    worker claims a batch of pending rows, applies it in one transaction and
+    repeats until the queue is drained, so intake latency stays flat however
+    many events arrive in a burst.
+    """
+
+    def __init__(self, workers: int = PAYMENT_WORKERS, batch_size: int = PAYMENT_BATCH_SIZE,
+                 session_factory=AsyncSessionLocal, poll_interval: float = PAYMENT_POLL_INTERVAL):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.processed = 0
+        self.batches = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self):
+        """Signal that events were queued; never blocks the caller"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                while await self.process_batch() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Payment event processing error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, db):
+        claim = uuid.uuid4().hex
+        now = datetime.utcnow()
+        claimable = (
+            PaymentEvent.status == "pending",
+            PaymentEvent.attempts < PAYMENT_MAX_ATTEMPTS,
+            or_(
+                PaymentEvent.claimed_at.is_(None),
+                PaymentEvent.claimed_at < now - timedelta(seconds=PAYMENT_CLAIM_TIMEOUT),
+            ),
+        )
+        pending = (
+            select(PaymentEvent.id)
+            .where(*claimable)
+            .order_by(PaymentEvent.id)
+            .limit(self.batch_size)
+        )
+        # As in the outbox, the claim condition is repeated on the outer
+        # statement so concurrent workers never claim the same row
+        await db.execute(
+            update(PaymentEvent)
+            .where(PaymentEvent.id.in_(pending.scalar_subquery()), *claimable)
+            .values(claimed_by=claim, claimed_at=now, attempts=PaymentEvent.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        result = await db.execute(
+            select(PaymentEvent.id, PaymentEvent.payload, PaymentEvent.attempts)
+            .where(PaymentEvent.claimed_by == claim)
+        )
+        return result.all()
+
+    async def process_batch(self) -> int:
+        """Claim and apply one batch; returns how many events were claimed"""
+        async with self.session_factory() as db:
+            rows = await self._claim(db)
+            if not rows:
+                return 0
+            try:
+                await apply_payment_events(db, rows)
+            except Exception as e:
+                # Release the claim so the batch is retried right away; events
+                # out of attempts are given up on. Should this fail too, the
+                # rows are picked up again after the claim timeout.
+                await db.rollback()
+                print(f"Payment batch failed: {e}")
+                exhausted = [row.id for row in rows if row.attempts >= PAYMENT_MAX_ATTEMPTS]
+                retry = [row.id for row in rows if row.attempts < PAYMENT_MAX_ATTEMPTS]
+                if exhausted:
+                    await db.execute(
+                        update(PaymentEvent)
+                        .where(PaymentEvent.id.in_(exhausted))
+                        .values(status="failed", error=str(e), processed_at=datetime.utcnow())
+                        .execution_options(synchronize_session=False)
+                    )
+                if retry:
+                    await db.execute(
+                        update(PaymentEvent)
+                        .where(PaymentEvent.id.in_(retry))
+                        .values(claimed_by=None, claimed_at=None)
+                        .execution_options(synchronize_session=False)
+                    )
+                await db.commit()
+                return len(rows)
+
+        dispatcher.wake()
+        self.processed += len(rows)
+        self.batches += 1
+        return len(rows)
+
+
+# Payment event processor of each branch, started with the app
+processor = BranchLocal(PaymentProcessor)
@@ -0,0 +1,223 @@
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.branches import BranchLocal
+
+# Relative weight of a match in each indexed field
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+# Match quality of a query word against an indexed word
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.7
+# Words shorter than this only match exactly or by prefix
+MIN_FUZZY_LENGTH = 3
+# Minimum share of trigrams in common for an indexed word to be checked as a typo
+CANDIDATE_THRESHOLD = 0.3
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-free words of ``text``"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text)
+    return TOKEN_RE.findall("".join(c for c in text if not unicodedata.combining(c)).lower())
+
+
+def max_edits(word: str) -> int:
+    """Typos tolerated in a query word"""
+    return 1 if len(word) <= 7 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance counting transpositions as one edit; anything over ``limit`` is limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def trigrams(word: str, prefix: bool = False) -> Set[str]:
+    """Trigrams of a word padded with '$'; a prefix is left open at the end"""
+    padded = f"${word}" if prefix else f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MenuSearchIndex:
+    """Process-local inverted index over menu item names, descriptions and categories.
+
+    Words are indexed per item with the weight of the best field they occur
+    in, and every distinct word is indexed by its trigrams. A query word
+    matches indexed words exactly, by prefix (the last query word, while it
+    is being typed) or, for typos, within one or two edits; candidates for
+    the edit distance check come from the trigram index. Items
+    must match every query word and are ranked by the weighted sum of their
+    best matches. Menu writes update the index one item at a time.
+    """
+
+    def __init__(self):
+        self._items: Dict[int, Dict] = {}
+        self._words: Dict[int, Dict[str, float]] = {}  # item -> word -> field weight
+        self._postings: Dict[str, Dict[int, float]] = {}  # word -> item -> field weight
+        self._grams: Dict[str, Set[str]] = {}  # trigram -> words
+        self._vocabulary: List[str] = []  # sorted, for prefix lookups
+        # Bumped by every write, so a load racing with one leaves the index stale
+        self.generation = 0
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._items)
+
+    def load(self, menu_items: Iterable[Dict], generation: int):
+        """Replace the index with serialized menu items read at ``generation``.
+
+        ``generation`` must be captured before the items were queried; if a
+        write came in meanwhile the index is used but reloaded next time.
+        """
+        self._items = {}
+        self._words = {}
+        self._postings = {}
+        self._grams = {}
+        self._vocabulary = []
+        for item in menu_items:
+            self._add(item)
+        self.loaded = generation == self.generation
+
+    def invalidate(self):
+        """Drop the index so the next search reloads it (after bulk writes)"""
+        self.generation += 1
+        self.loaded = False
+
+    def upsert(self, item: Dict):
+        """Index a created or updated menu item"""
+        self.generation += 1
+        self._discard(item["id"])
+        self._add(item)
+
+    def remove(self, item_id: int):
+        """Drop a deleted menu item"""
+        self.generation += 1
+        self._discard(item_id)
+
+    def _add(self, item: Dict):
+        words: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for word in tokenize(item.get(field)):
+                words[word] = max(words.get(word, 0.0), weight)
+        self._items[item["id"]] = item
+        self._words[item["id"]] = words
+        for word, weight in words.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                insort(self._vocabulary, word)
+                for gram in trigrams(word):
+                    self._grams.setdefault(gram, set()).add(word)
+            postings[item["id"]] = weight
+
+    def _discard(self, item_id: int):
+        self._items.pop(item_id, None)
+        for word in self._words.pop(item_id, {}):
+            postings = self._postings[word]
+            del postings[item_id]
+            if not postings:
+                del self._postings[word]
+                del self._vocabulary[bisect_left(self._vocabulary, word)]
+                for gram in trigrams(word):
+                    words = self._grams[gram]
+                    words.discard(word)
+                    if not words:
+                        del self._grams[gram]
+
+    def _similar(self, word: str, prefix: bool) -> Dict[str, float]:
+        """Indexed words matching a query word, with their match quality"""
+        matches = {}
+        if word in self._postings:
+            matches[word] = EXACT_SCORE
+        if prefix:
+            for candidate in self._vocabulary[bisect_left(self._vocabulary, word):]:
+                if not candidate.startswith(word):
+                    break
+                matches.setdefault(candidate, PREFIX_SCORE)
+        if len(word) < MIN_FUZZY_LENGTH:
+            return matches
+
+        # Typos: indexed words sharing enough trigrams, then within a few edits
+        # of the query word, or of the part typed so far for the last word
+        limit = max_edits(word)
+        grams = trigrams(word, prefix=prefix)
+        shared = Counter(candidate for gram in grams for candidate in self._grams.get(gram, ()))
+        for candidate, count in shared.items():
+            if candidate in matches or count < CANDIDATE_THRESHOLD * len(grams):
+                continue
+            if prefix:
+                edits = min(edit_distance(word, candidate[:length], limit)
+                            for length in range(len(word) - limit, len(word) + limit + 1))
+            else:
+                edits = edit_distance(word, candidate, limit)
+            if edits <= limit:
+                matches[candidate] = FUZZY_SCORE * (1 - edits / (len(word) + 1))
+        return matches
+
+    def search(self, query: str, category: Optional[str] = None, available_only: bool = True,
+               limit: int = 20) -> Dict:
+        """Ranked items matching every word of ``query``, with category facet counts.
+
+        Facets count every match regardless of ``category``, so that clients
+        can offer the other categories as refinements.
+        """
+        words = tokenize(query)
+        scores: Optional[Dict[int, float]] = None
+        for position, word in enumerate(words):
+            word_scores: Dict[int, float] = {}
+            for candidate, quality in self._similar(word, prefix=position == len(words) - 1).items():
+                for item_id, weight in self._postings[candidate].items():
+                    score = quality * weight
+                    if score > word_scores.get(item_id, 0.0):
+                        word_scores[item_id] = score
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {item_id: score + word_scores[item_id]
+                          for item_id, score in scores.items() if item_id in word_scores}
+            if not scores:
+                break
+
+        facets: Dict[str, int] = {}
+        hits: List[Tuple[float, str, int]] = []
+        for item_id, score in (scores or {}).items():
+            item = self._items[item_id]
+            if available_only and not item["available"]:
+                continue
+            facets[item["category"]] = facets.get(item["category"], 0) + 1
+            if category is None or item["category"] == category:
+                hits.append((-score, item["name"], item_id))
+        top = heapq.nsmallest(limit, hits)
+
+        return {
+            "query": query,
+            "total": len(hits),
+            "results": [
+                {**self._items[item_id], "score": round(-score, 3)} for score, _, item_id in top
+            ],
+            "facets": {"category": dict(sorted(facets.items()))},
+        }
+
+
+# Menu search index of each branch, loaded on first search
+menu_search = BranchLocal(MenuSearchIndex)
@@ -0,0 +1,146 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decouple import config
+from jose import JWTError, jwt
+from passlib.context import CryptContext
+import asyncio
+import os
+import secrets
+import time
+
+from app.core.branches import BranchLocal, current_branch
+
+# Admin endpoints require an admin token; set to false only for local development
+# (the dashboard sends no token yet), where admin endpoints accept anonymous requests
+ADMIN_AUTH_REQUIRED = config('ADMIN_AUTH_REQUIRED', default=True, cast=bool)
+# Signs access tokens and must be shared by every worker. Only with admin auth turned
+# off may it be left unset; each process then signs with a random key of its own
+SECRET_KEY = config('SECRET_KEY', default='')
+if not SECRET_KEY:
+    if ADMIN_AUTH_REQUIRED:
+        raise RuntimeError("SECRET_KEY is not set (set ADMIN_AUTH_REQUIRED=false for local development)")
+    print("SECRET_KEY is not set: signing tokens with a random key, valid only in this process until it restarts")
+    SECRET_KEY = secrets.token_urlsafe(32)
+ALGORITHM = config('JWT_ALGORITHM', default='HS256')
+ACCESS_TOKEN_EXPIRE_MINUTES = config('ACCESS_TOKEN_EXPIRE_MINUTES', default=60, cast=int)
+# Threads hashing and verifying passwords; each bcrypt call keeps a core busy for
+# ~100-250 ms, so by default half the cores are left to the event loop
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=max(1, (os.cpu_count() or 2) // 2), cast=int)
+# Seconds a login may wait for a hashing slot before it is turned away
+PASSWORD_HASH_TIMEOUT = config('PASSWORD_HASH_TIMEOUT', default=10.0, cast=float)
+# Decoded tokens kept in memory so repeat requests skip signature checks
+TOKEN_CACHE_SIZE = config('TOKEN_CACHE_SIZE', default=1024, cast=int)
+# Users cached by email, and for how many seconds
+USER_CACHE_SIZE = config('USER_CACHE_SIZE', default=1024, cast=int)
+USER_CACHE_TTL = config('USER_CACHE_TTL', default=60, cast=int)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt releases the GIL, so a small pool keeps hashing off the event loop
+# without letting a login burst take over every core
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+
+# Verified against when the email is unknown, so response time does not reveal which accounts exist
+_DUMMY_HASH = "$2b$12$RGKfLrxtCI0X1TXuAyekPe.nWRFMou8wsTABuScAFTcj9Wo.PYZ0C"
+
+
+class HashingBusy(Exception):
+    """No hashing slot became free within PASSWORD_HASH_TIMEOUT"""
+
+
+async def _run_hashing(fn, *args):
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=PASSWORD_HASH_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HashingBusy()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+    finally:
+        _hash_slots.release()
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hashing(pwd_context.hash, password)
+
+
+async def verify_password(password: str, hashed_password: Optional[str]) -> bool:
+    """Check a password; without a hash a dummy one is verified so unknown users take as long"""
+    valid = await _run_hashing(pwd_context.verify, password, hashed_password or _DUMMY_HASH)
+    return valid and hashed_password is not None
+
+
+class LRUCache:
+    """Small ordered-dict LRU with an optional per-entry expiry (epoch seconds)"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value, expires_at: Optional[float] = None):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = LRUCache(TOKEN_CACHE_SIZE)
+# Each branch has its own users table
+user_cache = BranchLocal(lambda: LRUCache(USER_CACHE_SIZE))
+
+
+def create_access_token(subject: str, is_admin: bool = False, expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
+    """Token for a user of the current branch"""
+    expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
+    claims = {"sub": subject, "admin": is_admin, "branch": current_branch.get(), "exp": expire}
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str) -> Optional[Dict]:
+    """Claims of a valid, unexpired token, or None; decoded tokens are cached until they expire"""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if "sub" not in claims or "exp" not in claims:
+        return None
+    token_cache.set(token, claims, expires_at=claims["exp"])
+    return claims
+
+
+def cache_user(user) -> Dict:
+    """Cache the fields auth needs from a User row, keyed by email"""
+    snapshot = {
+        "id": user.id,
+        "email": user.email,
+        "hashed_password": user.hashed_password,
+        "full_name": user.full_name,
+        "is_active": user.is_active,
+        "is_admin": user.is_admin,
+    }
+    user_cache.set(user.email, snapshot, expires_at=time.time() + USER_CACHE_TTL)
+    return snapshot
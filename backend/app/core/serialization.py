@@ -0,0 +1,81 @@
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Sequence, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import null
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, json is the fallback
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, byte-identical to FastAPI's JSONResponse for plain data"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse for content that is already JSON-ready (dicts, lists, str, int...).
+
+    Endpoints return it directly, which skips FastAPI's response_model
+    validation and jsonable_encoder walk; the declared response_model still
+    documents the endpoint in the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+# Converters from database values to the JSON FastAPI would emit for a field type
+CONVERTERS: Dict[type, Callable] = {
+    datetime: _isoformat,
+    date: _isoformat,
+}
+
+
+class RowSerializer:
+    """Builds response dicts for a schema straight from row tuples.
+
+    ``columns`` selects one column per schema field, in schema field order,
+    so serializing a row is a zip of field names with the row plus the
+    precomputed converters, rather than a Pydantic validation of an ORM
+    instance. Schema fields that are not mapped columns (relationships such
+    as ``Order.items``) are selected as NULL for the caller to fill in.
+    """
+
+    def __init__(self, schema: Type[BaseModel], model):
+        self.schema = schema
+        self.fields = list(schema.__fields__)
+        mapped = self._mapped = set(model.__mapper__.column_attrs.keys())
+        self.columns = [
+            getattr(model, field) if field in mapped else null().label(field)
+            for field in self.fields
+        ]
+        self._converters = [
+            (field, CONVERTERS[schema.__fields__[field].outer_type_])
+            for field in self.fields
+            if field in mapped and schema.__fields__[field].outer_type_ in CONVERTERS
+        ]
+
+    def __call__(self, row: Sequence) -> Dict:
+        data = dict(zip(self.fields, row))
+        for field, convert in self._converters:
+            data[field] = convert(data[field])
+        return data
+
+    def many(self, rows: Sequence[Sequence]) -> List[Dict]:
+        return [self(row) for row in rows]
+
+    def from_instance(self, instance) -> Dict:
+        """Serialize an ORM instance already in hand, without its relationships"""
+        return self(tuple(getattr(instance, field, None) if field in self._mapped else None
+                          for field in self.fields))
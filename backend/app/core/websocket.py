@@ -1,35 +1,339 @@
 from fastapi import WebSocket, APIRouter
-from typing import List, Dict
+from typing import Awaitable, Callable, List, Dict, Optional, Set, Tuple
+from collections import deque
+from decouple import config
+import asyncio
 import json
+import time
+import uuid
+
+from app.api.v1.dependencies import websocket_admin
+from app.core.active_orders import OPEN_STATUSES
+from app.core.branches import DEFAULT_BRANCH, BranchLocal
+from app.core.events import create_event_bus
+from app.core.metrics import registry
 
 router = APIRouter()
 
+# Outbound messages buffered per admin socket before the slow-consumer policy kicks in
+SEND_QUEUE_SIZE = config('WS_SEND_QUEUE_SIZE', default=100, cast=int)
+# 'coalesce' collapses superseded messages and drops the oldest; 'evict' closes the socket
+SLOW_CONSUMER_POLICY = config('WS_SLOW_CONSUMER_POLICY', default='coalesce')
+# Seconds a single send may take before the connection is considered dead
+SEND_TIMEOUT = config('WS_SEND_TIMEOUT', default=5.0, cast=float)
+# Recent events kept for replay to admin sockets that reconnect
+REPLAY_BUFFER_SIZE = config('WS_REPLAY_BUFFER_SIZE', default=1000, cast=int)
+# Events arriving within this many ms of the previous one are batched into one frame; 0 disables
+BATCH_WINDOW_MS = config('WS_BATCH_WINDOW_MS', default=0, cast=int)
+# Seconds between keepalives on idle customer order streams
+ORDER_STREAM_KEEPALIVE = config('ORDER_STREAM_KEEPALIVE', default=15.0, cast=float)
+
+# Admin events also delivered to customers tracking the order they concern
+ORDER_EVENT_TYPES = {"order_status_change", "payment_status_change"}
+
+BROADCAST_DURATION = registry.histogram(
+    "ws_broadcast_duration_seconds", "Time to sequence, serialize and queue one admin event for every socket")
+SEND_DURATION = registry.histogram(
+    "ws_send_duration_seconds", "Time for a single WebSocket send to an admin")
+
+
+class AdminConnection:
+    """An admin socket with a bounded send queue drained by its own writer task"""
+
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.manager = manager
+        self.queue = deque()  # (coalesce_key, text, enqueued_at)
+        self.connected_at = time.monotonic()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_send_ms = 0.0
+        self.last_lag_ms = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+
+    def stop(self):
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    def enqueue(self, text: str, key=None) -> bool:
+        """Queue a serialized message without blocking; False if the consumer is too slow"""
+        if len(self.queue) >= SEND_QUEUE_SIZE:
+            if SLOW_CONSUMER_POLICY == 'evict':
+                return False
+            self._make_room(key)
+        self.queue.append((key, text, time.monotonic()))
+        self._wakeup.set()
+        return True
+
+    def _make_room(self, key):
+        # A newer message with the same key supersedes whatever is still queued
+        if key is not None:
+            kept = deque(entry for entry in self.queue if entry[0] != key)
+            self.coalesced += len(self.queue) - len(kept)
+            self.queue = kept
+        while len(self.queue) >= SEND_QUEUE_SIZE:
+            self.queue.popleft()
+            self.dropped += 1
+
+    async def _writer(self):
+        try:
+            while True:
+                if not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                _, text, enqueued_at = self.queue.popleft()
+                started = time.monotonic()
+                await asyncio.wait_for(self.websocket.send_text(text), timeout=SEND_TIMEOUT)
+                finished = time.monotonic()
+                self.sent += 1
+                SEND_DURATION.observe(finished - started)
+                self.last_send_ms = (finished - started) * 1000
+                self.last_lag_ms = (finished - enqueued_at) * 1000
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error sending to admin: {e}")
+            await self.manager.evict(self)
+
+    def stats(self) -> Dict:
+        oldest = self.queue[0][2] if self.queue else None
+        return {
+            "client": f"{self.websocket.client.host}:{self.websocket.client.port}" if self.websocket.client else None,
+            "connected_seconds": round(time.monotonic() - self.connected_at, 1),
+            "queued": len(self.queue),
+            "lag_ms": round((time.monotonic() - oldest) * 1000, 1) if oldest is not None else 0.0,
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "last_send_ms": round(self.last_send_ms, 1),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+
+class OrderSubscription:
+    """A customer stream (SSE or WebSocket) tracking one order.
+
+    Only the latest undelivered event of each type is kept, since a newer
+    status supersedes an older one, so an idle subscription is a handful of
+    slots rather than a queue and a writer task.
+    """
+    __slots__ = ("order_id", "pending", "closed", "_waiter")
+
+    def __init__(self, order_id: int):
+        self.order_id = order_id
+        self.pending: Optional[Dict[str, str]] = None  # event type -> serialized event
+        self.closed = False  # the order reached a final status
+        self._waiter: Optional[asyncio.Future] = None
+
+    def push(self, event_type: str, text: str, final: bool = False):
+        if self.pending is None:
+            self.pending = {}
+        self.pending[event_type] = text
+        self.closed = self.closed or final
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def ready(self) -> asyncio.Future:
+        """Future resolved once an event is pending"""
+        if self._waiter is None or self._waiter.done():
+            self._waiter = asyncio.get_running_loop().create_future()
+        if self.pending:
+            self._waiter.set_result(None)
+        return self._waiter
+
+    def drain(self) -> List[Tuple[str, str]]:
+        """Pending (event type, text) pairs, oldest type first"""
+        pending, self.pending = self.pending, None
+        return list(pending.items()) if pending else []
+
+    async def next(self, timeout: float) -> List[Tuple[str, str]]:
+        """Wait up to ``timeout`` seconds for events; an empty list means none came"""
+        try:
+            await asyncio.wait_for(self.ready(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        return self.drain()
+
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.admin_connections: List[WebSocket] = []
+        self.admin_connections: Dict[WebSocket, AdminConnection] = {}
+        self.evicted = 0
+        # Customer order streams by order id, so an update only touches that order's watchers
+        self.order_subscriptions: Dict[int, Set[OrderSubscription]] = {}
+        # Sequenced event history; the epoch changes whenever the sequence restarts
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.history = deque(maxlen=REPLAY_BUFFER_SIZE)  # (seq, text)
+        self.replayed = 0
+        self.snapshots = 0
+        # Async callable returning the current state for clients that fell too far behind
+        self.snapshot_provider: Optional[Callable[[], Awaitable[Dict]]] = None
+        # Callables applying every published event to process-local state
+        self.listeners: List[Callable[[Dict], None]] = []
+        self._pending = []  # (seq, text) waiting for the burst window to close
+        self._flush_handle = None
+        self._last_delivery = 0.0
+        # Notifications go through the bus so every worker's admins see them
+        self.bus = create_event_bus(self.broadcast_to_admins)
+
+    async def start(self):
+        await self.bus.start()
+
+    async def stop(self):
+        await self.bus.stop()
 
     async def connect(self, websocket: WebSocket, is_admin: bool = False):
         await websocket.accept()
         if is_admin:
-            self.admin_connections.append(websocket)
+            connection = AdminConnection(websocket, self)
+            await self._resume(connection)
+            self.admin_connections[websocket] = connection
+            connection.start()
+
+    async def _resume(self, connection: AdminConnection):
+        """Queue what a reconnecting admin missed, given ?last_seq=N&epoch=E on the socket URL"""
+        params = connection.websocket.query_params
+        if "last_seq" not in params:
+            return
+        try:
+            last_seq = int(params["last_seq"])
+        except ValueError:
+            last_seq = -1
+
+        missed = self.seq - last_seq
+        oldest = self.history[0][0] if self.history else self.seq + 1
+        if (params.get("epoch") == self.epoch and 0 <= missed <= SEND_QUEUE_SIZE
+                and last_seq >= oldest - 1):
+            self.replayed += 1
+            since = last_seq
         else:
-            self.active_connections.append(websocket)
+            # The gap has aged out of the buffer (or the sequence restarted): send a snapshot
+            self.snapshots += 1
+            since = self.seq
+            data = await self.snapshot_provider() if self.snapshot_provider else None
+            snapshot = {"type": "snapshot", "seq": since, "epoch": self.epoch, "data": data}
+            connection.enqueue(json.dumps(snapshot))
+
+        for seq, text in self.history:
+            if seq > since:
+                connection.enqueue(text)
 
     def disconnect(self, websocket: WebSocket, is_admin: bool = False):
         if is_admin:
-            self.admin_connections.remove(websocket)
-        else:
-            self.active_connections.remove(websocket)
+            connection = self.admin_connections.pop(websocket, None)
+            if connection:
+                connection.stop()
+
+    def subscribe(self, order_id: int) -> OrderSubscription:
+        """Start tracking an order for a customer stream"""
+        subscription = OrderSubscription(order_id)
+        self.order_subscriptions.setdefault(order_id, set()).add(subscription)
+        return subscription
 
-    async def broadcast_to_admins(self, message: Dict):
-        """Send message to all admin connections"""
-        for connection in self.admin_connections:
+    def unsubscribe(self, subscription: OrderSubscription):
+        subscriptions = self.order_subscriptions.get(subscription.order_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.order_subscriptions[subscription.order_id]
+
+    def _notify_subscribers(self, message: Dict):
+        """Hand an order event to the customers tracking that order, serialized once"""
+        if message.get("type") not in ORDER_EVENT_TYPES:
+            return
+        data = message.get("data") or {}
+        subscriptions = self.order_subscriptions.get(data.get("order_id"))
+        if not subscriptions:
+            return
+        text = json.dumps(message)
+        final = message["type"] == "order_status_change" and data.get("status") not in OPEN_STATUSES
+        for subscription in subscriptions:
+            subscription.push(message["type"], text, final)
+
+    async def evict(self, connection: AdminConnection):
+        """Drop a slow or broken admin connection"""
+        if self.admin_connections.pop(connection.websocket, None) is None:
+            return
+        self.evicted += 1
+        connection.stop()
+        try:
+            # 1013: try again later; the client reconnects and reloads
+            await connection.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def broadcast_to_admins(self, message: Dict, key=None):
+        """Sequence and serialize the message once, then queue it for every admin connection"""
+        started = time.perf_counter()
+        try:
+            self._broadcast(message, key)
+        finally:
+            BROADCAST_DURATION.observe(time.perf_counter() - started)
+
+    def _broadcast(self, message: Dict, key=None):
+        for listener in self.listeners:
             try:
-                await connection.send_json(message)
+                listener(message)
             except Exception as e:
-                print(f"Error sending to admin: {e}")
-                self.admin_connections.remove(connection)
+                print(f"Event listener error: {e}")
+        self._notify_subscribers(message)
+
+        self.seq += 1
+        text = json.dumps({**message, "seq": self.seq, "epoch": self.epoch})
+        self.history.append((self.seq, text))
+
+        if BATCH_WINDOW_MS <= 0:
+            self._deliver(text, key)
+            return
+
+        # Burst mode: events closer together than the window share one frame
+        loop = asyncio.get_running_loop()
+        window = BATCH_WINDOW_MS / 1000
+        if self._pending or loop.time() - self._last_delivery < window:
+            self._pending.append((self.seq, text))
+            if self._flush_handle is None:
+                self._flush_handle = loop.call_later(window, self._flush)
+        else:
+            self._last_delivery = loop.time()
+            self._deliver(text, key)
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        self._flush_handle = None
+        self._last_delivery = asyncio.get_running_loop().time()
+        if len(pending) == 1:
+            self._deliver(pending[0][1])
+        elif pending:
+            self._deliver(
+                f'{{"type": "batch", "first_seq": {pending[0][0]}, "last_seq": {pending[-1][0]}, '
+                f'"epoch": "{self.epoch}", "events": [{", ".join(text for _, text in pending)}]}}'
+            )
+
+    def _deliver(self, text: str, key=None):
+        for connection in list(self.admin_connections.values()):
+            if not connection.enqueue(text, key):
+                print("Evicting slow admin connection")
+                asyncio.create_task(self.evict(connection))
+
+    def stats(self) -> Dict:
+        """Per-connection lag metrics for the admin sockets"""
+        return {
+            "policy": SLOW_CONSUMER_POLICY,
+            "queue_size": SEND_QUEUE_SIZE,
+            "evicted": self.evicted,
+            "seq": self.seq,
+            "epoch": self.epoch,
+            "replayed": self.replayed,
+            "snapshots": self.snapshots,
+            "connections": [connection.stats() for connection in self.admin_connections.values()],
+        }
 
     async def notify_new_order(self, order_data: Dict):
         """Notify admins of new order"""
@@ -37,7 +341,18 @@ class ConnectionManager:
             "type": "new_order",
             "data": order_data
         }
-        await self.broadcast_to_admins(message)
+        await self.bus.publish(message)
+
+    async def notify_new_orders_batch(self, orders_data: List[Dict]):
+        """Notify admins of many new orders with a single event"""
+        message = {
+            "type": "new_orders_batch",
+            "data": {
+                "count": len(orders_data),
+                "orders": orders_data
+            }
+        }
+        await self.bus.publish(message)
 
     async def notify_order_status_change(self, order_id: int, status: str):
         """Notify admins of order status change"""
@@ -48,10 +363,14 @@ class ConnectionManager:
                 "status": status
             }
         }
-        await self.broadcast_to_admins(message)
+        await self.bus.publish(message, key=("order_status", order_id))
 
 @router.websocket("/ws/admin")
 async def admin_websocket(websocket: WebSocket):
+    # Order snapshots carry customer details: refuse before accepting
+    if not await websocket_admin(websocket):
+        await websocket.close(code=1008)
+        return
     await manager.connect(websocket, is_admin=True)
     try:
         while True:
@@ -62,5 +381,18 @@ async def admin_websocket(websocket: WebSocket):
     finally:
         manager.disconnect(websocket, is_admin=True)
 
-# Global connection manager instance
-manager = ConnectionManager()
+# Connection manager of each branch; admin sockets and order streams only see their branch's events
+manager = BranchLocal(ConnectionManager)
+
+registry.gauge("ws_admin_connections", "Connected admin sockets, all branches",
+               function=lambda: sum(len(branch.admin_connections) for branch in manager.instances()))
+registry.gauge("ws_admin_queued_messages", "Messages waiting in admin send queues, all branches",
+               function=lambda: sum(len(connection.queue) for branch in manager.instances()
+                                    for connection in branch.admin_connections.values()))
+registry.gauge("ws_admin_evicted", "Admin sockets evicted as slow or broken since startup, all branches",
+               function=lambda: sum(branch.evicted for branch in manager.instances()))
+registry.gauge("ws_event_seq", "Sequence number of the last admin event of the default branch",
+               function=lambda: manager.instance(DEFAULT_BRANCH).seq)
+registry.gauge("order_stream_subscriptions", "Customer SSE and WebSocket streams tracking an order, all branches",
+               function=lambda: sum(len(subscriptions) for branch in manager.instances()
+                                    for subscriptions in branch.order_subscriptions.values()))
@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import List
+from decouple import config
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+# Finished orders older than this many days are moved to the archive tables
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=30, cast=int)
+# Orders moved per transaction; keeps each write lock short
+ARCHIVE_BATCH_SIZE = config('ARCHIVE_BATCH_SIZE', default=500, cast=int)
+
+FINISHED_STATUSES = ("delivered", "cancelled")
+
+ORDER_COLUMNS = [column.name for column in Order.__table__.columns]
+ORDER_ITEM_COLUMNS = [column.name for column in OrderItem.__table__.columns]
+
+
+def archivable(cutoff: datetime):
+    """Finished orders created before ``cutoff``.
+
+    The newest order always stays live: SQLite hands out max(id) + 1 to the
+    next insert, which would reuse the id of an archived order (and its items).
+    """
+    newest = select(func.max(Order.id)).correlate(None).scalar_subquery()
+    return (Order.status.in_(FINISHED_STATUSES), Order.created_at < cutoff, Order.id < newest)
+
+
+def count_archivable(db: Session, cutoff: datetime) -> int:
+    return db.execute(select(func.count()).select_from(Order).filter(*archivable(cutoff))).scalar_one()
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> List[int]:
+    """Move up to ``batch_size`` finished orders and their items to the archive tables.
+
+    The ids are picked in a read transaction of their own, so the write
+    transaction starts with its first INSERT and holds the lock only for
+    the copy and delete of one batch. Rows are copied as stored; the
+    analytics rollups already count these orders and are left untouched.
+    Returns the ids moved, empty once nothing is left to archive.
+    """
+    order_ids = db.execute(
+        select(Order.id).filter(*archivable(cutoff)).order_by(Order.created_at, Order.id).limit(batch_size)
+    ).scalars().all()
+    db.rollback()
+    if not order_ids:
+        return []
+
+    # Re-check the filter so an order changed since the read stays live
+    moved = select(Order.id).filter(Order.id.in_(order_ids), *archivable(cutoff))
+    db.execute(insert(ArchivedOrder).from_select(
+        ORDER_COLUMNS, select(*[getattr(Order, name) for name in ORDER_COLUMNS]).filter(Order.id.in_(moved))
+    ))
+    db.execute(insert(ArchivedOrderItem).from_select(
+        ORDER_ITEM_COLUMNS,
+        select(*[getattr(OrderItem, name) for name in ORDER_ITEM_COLUMNS])
+        .filter(OrderItem.order_id.in_(select(ArchivedOrder.id).filter(ArchivedOrder.id.in_(order_ids))))
+    ))
+    archived = select(ArchivedOrder.id).filter(ArchivedOrder.id.in_(order_ids))
+    db.execute(delete(OrderItem).filter(OrderItem.order_id.in_(archived)))
+    db.execute(delete(Order).filter(Order.id.in_(archived)))
+    moved_ids = db.execute(archived).scalars().all()
+    db.commit()
+    return moved_ids
@@ -0,0 +1,126 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models import ItemRollup, MenuItem, OrderRollup
+
+# Category recorded for items whose menu entry no longer exists
+UNKNOWN_CATEGORY = "Unknown"
+
+UPSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# (created_at, delivery_type, total_amount, [(menu_item_id, price, quantity, category), ...]);
+# the category recorded with the item, or None to use ``categories``
+RollupEntry = Tuple[datetime, str, int, Iterable[Tuple[int, int, int, Optional[str]]]]
+
+
+def naive_utc(timestamp: datetime) -> datetime:
+    """Normalize to the naive UTC datetimes stored in the rollup tables"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def hour_bucket(timestamp: datetime) -> datetime:
+    """Start of the UTC hour containing ``timestamp``"""
+    return naive_utc(timestamp).replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_deltas(entries: Iterable[RollupEntry], categories: Dict[int, str], sign: int = 1):
+    """Aggregate orders into order and item rollup deltas.
+
+    ``sign`` is -1 to reverse previously counted orders, e.g. on cancellation.
+    """
+    order_rows: Dict[tuple, Dict] = {}
+    item_rows: Dict[tuple, Dict] = {}
+    for created_at, delivery_type, total_amount, items in entries:
+        bucket = hour_bucket(created_at)
+        row = order_rows.setdefault((bucket, delivery_type), {
+            "bucket": bucket, "delivery_type": delivery_type, "order_count": 0, "revenue": 0,
+        })
+        row["order_count"] += sign
+        row["revenue"] += sign * total_amount
+
+        counted = set()
+        for menu_item_id, price, quantity, category in items:
+            category = category or categories.get(menu_item_id) or UNKNOWN_CATEGORY
+            key = (bucket, category, menu_item_id, delivery_type)
+            row = item_rows.setdefault(key, {
+                "bucket": bucket, "category": category, "menu_item_id": menu_item_id,
+                "delivery_type": delivery_type, "order_count": 0, "quantity": 0, "revenue": 0,
+            })
+            row["quantity"] += sign * quantity
+            row["revenue"] += sign * price * quantity
+            if key not in counted:
+                counted.add(key)
+                row["order_count"] += sign
+    return list(order_rows.values()), list(item_rows.values())
+
+
+def _upsert(dialect_name: str, model, keys: List[str], measures: List[str]):
+    table = model.__table__
+    stmt = UPSERTS[dialect_name](table)
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column: table.c[column] + stmt.excluded[column] for column in measures},
+    )
+
+
+def rollup_statements(dialect_name: str, order_rows: List[Dict], item_rows: List[Dict]):
+    """Upsert statements adding the deltas to the rollup tables, with their parameters"""
+    statements = []
+    if order_rows:
+        statements.append((
+            _upsert(dialect_name, OrderRollup, ["bucket", "delivery_type"], ["order_count", "revenue"]),
+            order_rows,
+        ))
+    if item_rows:
+        statements.append((
+            _upsert(dialect_name, ItemRollup, ["bucket", "category", "menu_item_id", "delivery_type"],
+                    ["order_count", "quantity", "revenue"]),
+            item_rows,
+        ))
+    return statements
+
+
+def category_query(menu_item_ids):
+    return select(MenuItem.id, MenuItem.category).filter(MenuItem.id.in_(menu_item_ids))
+
+
+async def apply_rollups(db, entries: Iterable[RollupEntry], categories: Optional[Dict[int, str]] = None,
+                        sign: int = 1):
+    """Add orders to the rollups inside the caller's transaction"""
+    entries = list(entries)
+    if categories is None:
+        menu_item_ids = {item[0] for entry in entries for item in entry[3] if item[3] is None}
+        result = await db.execute(category_query(menu_item_ids))
+        categories = dict(result.all())
+    order_rows, item_rows = rollup_deltas(entries, categories, sign)
+    for stmt, rows in rollup_statements(db.get_bind().dialect.name, order_rows, item_rows):
+        await db.execute(stmt, rows)
+
+
+def apply_rollups_sync(db, entries: Iterable[RollupEntry], categories: Optional[Dict[int, str]] = None,
+                       sign: int = 1):
+    """Synchronous variant of apply_rollups for scripts"""
+    entries = list(entries)
+    if categories is None:
+        menu_item_ids = {item[0] for entry in entries for item in entry[3] if item[3] is None}
+        categories = dict(db.execute(category_query(menu_item_ids)).all())
+    order_rows, item_rows = rollup_deltas(entries, categories, sign)
+    for stmt, rows in rollup_statements(db.get_bind().dialect.name, order_rows, item_rows):
+        db.execute(stmt, rows)
+
+
+def order_entry(order) -> RollupEntry:
+    """Rollup entry for an order with its items loaded"""
+    return (
+        order.created_at,
+        order.delivery_type,
+        order.total_amount,
+        [(item.menu_item_id, item.price, item.quantity, item.category) for item in order.items],
+    )
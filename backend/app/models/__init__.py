@@ -1,5 +1,10 @@
+from .analytics import ItemRollup, OrderRollup
+from .archive import ArchivedOrder, ArchivedOrderItem
+from .event import BusEvent, OutboxEvent
+from .idempotency import IdempotencyRecord
 from .menu import MenuItem
 from .order import Order, OrderItem
+from .payment import PaymentEvent
 from .user import User
 
-__all__ = ["MenuItem", "Order", "OrderItem", "User"]
+__all__ = ["ArchivedOrder", "ArchivedOrderItem", "BusEvent", "IdempotencyRecord", "ItemRollup", "MenuItem", "Order", "OrderItem", "OrderRollup", "OutboxEvent", "PaymentEvent", "User"]
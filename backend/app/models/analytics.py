@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.core.database import Base
+
+class OrderRollup(Base):
+    """Orders and revenue per hour and delivery type"""
+    __tablename__ = "order_rollups"
+
+    bucket = Column(DateTime, primary_key=True)  # Start of the hour, UTC
+    delivery_type = Column(String(20), primary_key=True)
+    order_count = Column(Integer, default=0, nullable=False)
+    revenue = Column(Integer, default=0, nullable=False)  # Revenue in paisa
+
+class ItemRollup(Base):
+    """Quantity and revenue per hour, category, menu item and delivery type"""
+    __tablename__ = "item_rollups"
+
+    bucket = Column(DateTime, primary_key=True)  # Start of the hour, UTC
+    category = Column(String(50), primary_key=True)
+    menu_item_id = Column(Integer, primary_key=True)
+    delivery_type = Column(String(20), primary_key=True)
+    order_count = Column(Integer, default=0, nullable=False)  # Orders containing the item
+    quantity = Column(Integer, default=0, nullable=False)
+    revenue = Column(Integer, default=0, nullable=False)  # Revenue in paisa
@@ -0,0 +1,38 @@
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, Index, func
+from app.core.database import Base
+from .order import Timestamp
+
+class ArchivedOrder(Base):
+    """Finished order moved out of ``orders`` by archive_orders.py; same columns, keyed by the original id"""
+    __tablename__ = "orders_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    customer_name = Column(String(100), nullable=False)
+    customer_email = Column(String(100), nullable=True)
+    customer_phone = Column(String(20), nullable=True)
+    delivery_type = Column(String(20), nullable=False)
+    delivery_address = Column(Text, nullable=True)
+    status = Column(String(20), nullable=False)  # delivered or cancelled
+    total_amount = Column(Integer, nullable=False)  # Total in paisa
+    estimated_time = Column(Integer, nullable=True)
+    payment_status = Column(String(20), nullable=True)
+    payment_intent_id = Column(String(255), nullable=True, index=True)
+    payment_version = Column(BigInteger, nullable=True)
+    created_at = Column(Timestamp, nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_orders_archive_created_at_id", "created_at", "id"),
+    )
+
+class ArchivedOrderItem(Base):
+    __tablename__ = "order_items_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, nullable=False, index=True)
+    menu_item_id = Column(Integer, nullable=False)
+    name = Column(String(100), nullable=False)
+    price = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    category = Column(String(50), nullable=True)
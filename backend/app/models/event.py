@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, func
+from app.core.database import Base
+
+class BusEvent(Base):
+    __tablename__ = "bus_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    origin = Column(String(32), nullable=False)  # Node that published the event
+    payload = Column(Text, nullable=False)  # JSON encoded message and coalesce key
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index("ix_outbox_events_pending", "delivered_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    payload = Column(Text, nullable=False)  # JSON encoded message and coalesce key
+    claimed_by = Column(String(32), nullable=True)  # Dispatcher batch currently delivering the event
+    claimed_at = Column(DateTime, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from app.core.database import Base
+
+class IdempotencyRecord(Base):
+    """Response stored for an Idempotency-Key, replayed to retries of the same request"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # SHA-256 of the request body
+    status_code = Column(Integer, nullable=False)
+    body = Column(Text, nullable=False)  # JSON response body
+    created_at = Column(DateTime, nullable=False, index=True)  # UTC
@@ -1,7 +1,17 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey, func, Float
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, Text, DateTime, ForeignKey, Index, func, Float
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds; bind values in the same
+# text format so keyset comparisons against stored timestamps stay exact
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 class Order(Base):
     __tablename__ = "orders"
 
@@ -14,21 +24,31 @@ class Order(Base):
     status = Column(String(20), default='pending', nullable=False)  # pending, accepted, preparing, ready, delivered, cancelled
     total_amount = Column(Integer, nullable=False)  # Total in paisa
     estimated_time = Column(Integer, nullable=True)  # Estimated time in minutes
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    payment_status = Column(String(20), default='unpaid', nullable=True)  # unpaid, requires_payment, processing, paid, failed, cancelled, refunded
+    payment_intent_id = Column(String(255), nullable=True, index=True)
+    payment_version = Column(BigInteger, nullable=True)  # Provider time and precedence of the last applied payment event
+    created_at = Column(Timestamp, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationship
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    # Keyset pagination indexes for newest-first listings, optionally by status
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
     name = Column(String(100), nullable=False)  # Store name at time of order
     price = Column(Integer, nullable=False)  # Price at time of order
     quantity = Column(Integer, nullable=False)
+    category = Column(String(50), nullable=True)  # Menu category at time of order, for its rollups
 
     # Relationship
     order = relationship("Order", back_populates="items")
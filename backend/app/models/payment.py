@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, func
+from app.core.database import Base
+
+class PaymentEvent(Base):
+    __tablename__ = "payment_events"
+    __table_args__ = (
+        Index("ix_payment_events_pending", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String(255), unique=True, nullable=False)  # Provider event id, used to drop redeliveries
+    event_type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)  # Raw verified event body
+    status = Column(String(20), default='pending', nullable=False)  # pending, processed, ignored, failed
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)  # Times a worker has claimed the event
+    claimed_by = Column(String(32), nullable=True)  # Worker batch currently processing the event
+    claimed_at = Column(DateTime, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,9 +1,11 @@
-from .menu import MenuItemCreate, MenuItemUpdate, MenuItem
-from .order import OrderCreate, OrderUpdate, Order, OrderItem
-from .user import UserCreate, UserUpdate, User
+from .menu import MenuItemCreate, MenuItemUpdate, MenuItem, MenuSearchHit, MenuSearchFacets, MenuSearchResponse
+from .order import OrderCreate, OrderUpdate, OrderStatusUpdate, Order, OrderItem, OrderBatchResult, OrderBatchResponse
+from .payment import PaymentIntentCreate, PaymentIntent, WebhookReceipt
+from .user import UserCreate, UserUpdate, User, UserLogin, Token
 
 __all__ = [
-    "MenuItemCreate", "MenuItemUpdate", "MenuItem",
-    "OrderCreate", "OrderUpdate", "Order", "OrderItem",
-    "UserCreate", "UserUpdate", "User"
+    "MenuItemCreate", "MenuItemUpdate", "MenuItem", "MenuSearchHit", "MenuSearchFacets", "MenuSearchResponse",
+    "OrderCreate", "OrderUpdate", "OrderStatusUpdate", "Order", "OrderItem", "OrderBatchResult", "OrderBatchResponse",
+    "PaymentIntentCreate", "PaymentIntent", "WebhookReceipt",
+    "UserCreate", "UserUpdate", "User", "UserLogin", "Token"
 ]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class MenuItemBase(BaseModel):
@@ -26,3 +26,16 @@ class MenuItem(MenuItemBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class MenuSearchHit(MenuItem):
+    score: float  # Relevance; higher is better
+
+class MenuSearchFacets(BaseModel):
+    category: Dict[str, int]  # Matches per category, before the category filter
+
+class MenuSearchResponse(BaseModel):
+    query: str
+    total: int
+    results: List[MenuSearchHit]
+    facets: MenuSearchFacets
@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+ORDER_STATUS_PATTERN = "^(pending|accepted|preparing|ready|delivered|cancelled)$"
+
 class OrderItemBase(BaseModel):
     menu_item_id: int
     name: str
@@ -9,7 +11,9 @@ class OrderItemBase(BaseModel):
     quantity: int
 
 class OrderItemCreate(OrderItemBase):
-    pass
+    # Name and price are resolved from the menu on the server
+    name: Optional[str] = None
+    price: Optional[int] = None
 
 class OrderItem(OrderItemBase):
     id: int
@@ -17,6 +21,7 @@ class OrderItem(OrderItemBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
 
 class OrderBase(BaseModel):
     customer_name: str
@@ -24,12 +29,12 @@ class OrderBase(BaseModel):
     customer_phone: Optional[str] = None
     delivery_type: str  # 'pickup' or 'delivery'
     delivery_address: Optional[str] = None
-    status: str = 'pending'
     estimated_time: Optional[int] = None
 
 class OrderCreate(OrderBase):
-    items: List[OrderItemCreate]
-    total_amount: int  # Total in paisa
+    # No status: new orders always start as 'pending' and only move through the status endpoint
+    items: List[OrderItemCreate] = Field(..., min_items=1)
+    total_amount: Optional[int] = None  # Recomputed from menu prices on the server
 
 class OrderUpdate(BaseModel):
     customer_name: Optional[str] = None
@@ -40,12 +45,31 @@ class OrderUpdate(BaseModel):
     status: Optional[str] = None
     estimated_time: Optional[int] = None
 
+class OrderStatusUpdate(BaseModel):
+    status: str = Field(..., regex=ORDER_STATUS_PATTERN)
+    estimated_time: Optional[int] = None  # Minutes; defaults to 30 when accepting or preparing
+
 class Order(OrderBase):
     id: int
+    status: str
     total_amount: int
     items: List[OrderItem]
+    payment_status: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class OrderBatchResult(BaseModel):
+    index: int  # Position of the order in the submitted batch
+    status: str  # 'created' or 'failed'
+    order_id: Optional[int] = None
+    total_amount: Optional[int] = None
+    error: Optional[str] = None
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBatchResult]
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+
+class PaymentIntentCreate(BaseModel):
+    order_id: int
+
+class PaymentIntent(BaseModel):
+    order_id: int
+    payment_intent_id: str
+    client_secret: str
+    amount: int  # Amount in paisa
+    currency: str
+
+class WebhookReceipt(BaseModel):
+    received: bool
+    duplicate: bool  # The event id was already queued, e.g. a provider retry
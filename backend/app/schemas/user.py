@@ -25,3 +25,13 @@ class User(UserBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = 'bearer'
+    expires_in: int  # Seconds until the token expires
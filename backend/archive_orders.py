@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.branches import BRANCHES
+from app.core.database import Base, databases
+from app.crud.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, archive_batch, count_archivable
+from app.models import ArchivedOrder, ArchivedOrderItem
+
+def archive_orders(branch: str, days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                   pause: float = 0.05, dry_run: bool = False):
+    """Move delivered and cancelled orders of a branch older than ``days`` to the archive tables, one batch per transaction"""
+    database = databases.instance(branch)
+    print(f"Connecting to database of branch '{branch}': {database.url}")
+    Base.metadata.create_all(bind=database.engine, tables=[ArchivedOrder.__table__, ArchivedOrderItem.__table__])
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    db = database.SessionLocal()
+    try:
+        if dry_run:
+            print(f"{count_archivable(db, cutoff)} finished orders created before {cutoff:%Y-%m-%d %H:%M} would be archived")
+            return True
+
+        total = 0
+        while True:
+            moved = archive_batch(db, cutoff, batch_size)
+            if not moved:
+                break
+            total += len(moved)
+            print(f"Archived {total} orders (through order {max(moved)})")
+            # Let queued writers in between batches
+            time.sleep(pause)
+        print(f"Archived {total} orders created before {cutoff:%Y-%m-%d %H:%M}")
+
+    except Exception as e:
+        print(f"Error archiving orders: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move finished orders to the archive tables")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive orders older than this")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="only count the orders to archive")
+    parser.add_argument("--branch", choices=BRANCHES, action="append",
+                        help="branch to archive (repeatable); all configured branches by default")
+    args = parser.parse_args()
+
+    print("Archiving finished orders...")
+    if all([archive_orders(branch, args.days, args.batch_size, args.pause, args.dry_run)
+            for branch in args.branch or BRANCHES]):
+        print("Order archival completed successfully!")
+    else:
+        print("Order archival failed!")
+        sys.exit(1)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+import os
+from collections import defaultdict
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import selectinload
+
+from app.core.branches import BRANCHES
+from app.core.database import Base, databases
+from app.crud.rollups import apply_rollups_sync, order_entry
+from app.models import ArchivedOrder, ArchivedOrderItem, ItemRollup, MenuItem, Order, OrderRollup
+
+def archived_entries(db, orders):
+    """Rollup entries for a chunk of archived orders, with their archived items"""
+    items = defaultdict(list)
+    for item in db.execute(
+        select(ArchivedOrderItem).filter(ArchivedOrderItem.order_id.in_([order.id for order in orders]))
+    ).scalars():
+        items[item.order_id].append((item.menu_item_id, item.price, item.quantity, item.category))
+    return [(order.created_at, order.delivery_type, order.total_amount, items[order.id]) for order in orders]
+
+def rollup_chunks(db, query, model, entries, categories, chunk_size, max_id):
+    """Roll up the orders of ``query`` up to ``max_id`` that were not cancelled, in chunks"""
+    last_id = 0
+    total = 0
+    while True:
+        orders = db.execute(
+            query.filter(model.id > last_id, model.id <= max_id, model.status != "cancelled")
+            .order_by(model.id)
+            .limit(chunk_size)
+        ).scalars().all()
+        if not orders:
+            break
+
+        apply_rollups_sync(db, entries(db, orders), categories)
+        last_id = orders[-1].id
+        total += len(orders)
+        db.expunge_all()
+        print(f"Rolled up {total} orders (through order {last_id})")
+    return total
+
+def backfill_rollups(branch: str, chunk_size: int = 1000):
+    """Rebuild the analytics rollup tables of a branch from its live and archived orders.
+
+    The rebuild is one transaction that holds off order writers, which update
+    the rollups themselves, until it commits: on SQLite clearing the rollups
+    takes the write lock, server backends lock the order tables. Orders
+    placed while it runs wait (or time out after SQLITE_BUSY_TIMEOUT_MS on
+    SQLite), so run it off-peak.
+    """
+    database = databases.instance(branch)
+    print(f"Connecting to database of branch '{branch}': {database.url}")
+    Base.metadata.create_all(bind=database.engine, tables=[OrderRollup.__table__, ItemRollup.__table__])
+
+    db = database.SessionLocal()
+    try:
+        categories = dict(db.execute(select(MenuItem.id, MenuItem.category)).all())
+
+        if database.engine.dialect.name != "sqlite":
+            prefix = f"{database.schema}." if database.schema else ""
+            db.execute(text(f"LOCK TABLE {prefix}orders, {prefix}orders_archive IN SHARE MODE"))
+        db.execute(delete(OrderRollup))
+        db.execute(delete(ItemRollup))
+        print("Cleared existing rollups")
+
+        # Orders after these ids are added to the rebuilt rollups by their own transactions
+        max_order_id = db.scalar(select(func.max(Order.id))) or 0
+        max_archived_id = db.scalar(select(func.max(ArchivedOrder.id))) or 0
+
+        total = rollup_chunks(db, select(Order).options(selectinload(Order.items)), Order,
+                              lambda db, orders: [order_entry(order) for order in orders], categories,
+                              chunk_size, max_order_id)
+        print(f"Rolled up {total} live orders")
+        # Archived orders are counted too, so the rebuild keeps their history
+        total = rollup_chunks(db, select(ArchivedOrder), ArchivedOrder, archived_entries, categories,
+                              chunk_size, max_archived_id)
+        print(f"Rolled up {total} archived orders")
+        db.commit()
+
+    except Exception as e:
+        print(f"Error backfilling rollups: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild analytics rollups from existing and archived orders")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--branch", choices=BRANCHES, action="append",
+                        help="branch to backfill (repeatable); all configured branches by default")
+    args = parser.parse_args()
+
+    print("Backfilling analytics rollups...")
+    if all([backfill_rollups(branch, args.chunk_size) for branch in args.branch or BRANCHES]):
+        print("Rollup backfill completed successfully!")
+    else:
+        print("Rollup backfill failed!")
+        sys.exit(1)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Rush-hour order intake with and without admission control.
+
+Floods POST /api/v1/orders/ from many concurrent customers (one address
+each, via X-Forwarded-For) while the kitchen keeps moving orders along
+with PUT /orders/{id}/status, and reports kitchen latency, customer
+latency and how many checkouts were shed with 429/503. Each mode runs in
+its own process against a fresh scratch database, since the limits are
+read at import; "off" lifts them out of reach.
+
+    python -m benchmarks.admission --customers 64 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.scenarios import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+UNLIMITED = {
+    "ADMISSION_WRITE_CONCURRENCY": "100000",
+    "ADMISSION_QUEUE_TARGET_MS": "1e9",
+    "ADMISSION_QUEUE_TIMEOUT_MS": "1e9",
+    "ADMISSION_CUSTOMER_QUEUE": "100000",
+    "ADMISSION_CLIENT_RATE": "1000000",
+}
+
+
+def basket(rng, menu_items):
+    return {
+        "customer_name": "Rush",
+        "delivery_type": rng.choice(["pickup", "delivery"]),
+        "items": [{"menu_item_id": rng.randint(1, menu_items), "quantity": 1} for _ in range(rng.randint(1, 4))],
+    }
+
+
+async def run(args):
+    import httpx
+    from app.core.database import async_engine, async_read_engine
+    from main import app
+
+    rng = random.Random(5)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        kitchen_orders = []
+        for i in range(args.kitchen_orders):
+            response = await client.post("/api/v1/orders/", json=basket(rng, args.menu_items),
+                                         headers={"X-Forwarded-For": f"10.1.{i // 250}.{i % 250}"})
+            kitchen_orders.append(response.json()["id"])
+
+        deadline = time.monotonic() + args.seconds
+        customer_latencies, kitchen_latencies = [], []
+        statuses = Counter()
+
+        async def customer(n):
+            headers = {"X-Forwarded-For": f"10.0.{n // 250}.{n % 250}"}
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.post("/api/v1/orders/", json=basket(rng, args.menu_items), headers=headers)
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    customer_latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    await asyncio.sleep(min(float(response.headers.get("retry-after", 1)), 1.0))
+
+        async def kitchen():
+            for order_id in kitchen_orders:
+                if time.monotonic() >= deadline:
+                    break
+                started = time.perf_counter()
+                response = await client.put(f"/api/v1/orders/{order_id}/status", json={"status": "accepted"})
+                kitchen_latencies.append((time.perf_counter() - started) * 1000)
+                statuses[f"kitchen {response.status_code}"] += 1
+                await asyncio.sleep(args.kitchen_interval)
+
+        await asyncio.gather(kitchen(), *(customer(n) for n in range(args.customers)))
+
+    print(f"[{args.mode}] kitchen status updates: {len(kitchen_latencies)}   "
+          f"p50 {percentile(kitchen_latencies, 50):7.1f}   p95 {percentile(kitchen_latencies, 95):7.1f}   "
+          f"max {max(kitchen_latencies):7.1f} ms")
+    if customer_latencies:
+        print(f"[{args.mode}] accepted checkouts: {len(customer_latencies)} ({len(customer_latencies) / args.seconds:.0f}/s)   "
+              f"p50 {percentile(customer_latencies, 50):7.1f}   p95 {percentile(customer_latencies, 95):7.1f} ms")
+    print(f"[{args.mode}] responses: {dict(sorted(statuses.items(), key=str))}")
+    await async_read_engine.dispose()
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["on", "off", "both"], default="both")
+    parser.add_argument("--customers", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--kitchen-orders", type=int, default=200)
+    parser.add_argument("--kitchen-interval", type=float, default=0.05)
+    parser.add_argument("--menu-items", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.mode == "both":
+        for mode in ("off", "on"):
+            subprocess.run([sys.executable, "-m", "benchmarks.admission", *sys.argv[1:], "--mode", mode],
+                           cwd=BACKEND_DIR, check=True)
+        return
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="admission-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["ADMISSION_TRUST_FORWARDED"] = "true"
+    # The kitchen updates order status without a token
+    os.environ.setdefault("ADMIN_AUTH_REQUIRED", "false")
+    os.environ.setdefault("SLOW_QUERY_MS", "0")
+    if args.mode == "off":
+        os.environ.update(UNLIMITED)
+    sys.path.insert(0, BACKEND_DIR)
+    from benchmarks.seed import seed_database
+
+    seed_database(db_path, args.menu_items, 2000, 30)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
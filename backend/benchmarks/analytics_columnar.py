@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Columnar analytics on a synthetic order history.
+
+Generates N orders (default one million) with ~2.5 items each in a scratch
+SQLite database, then times streaming the columns out of the database and
+each vectorized report. --orm-baseline also times computing the top items
+the row-by-row way, through ORM objects.
+
+    python -m benchmarks.analytics_columnar --orders 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.seed import generate
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(label, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    print(f"  {label:<28} {(time.perf_counter() - started) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--menu-items", type=int, default=300)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--orm-baseline", action="store_true")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="analytics-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, BACKEND_DIR)
+    from app.analytics import columnar
+    from app.core.database import Base, SessionLocal, engine
+    from app.models import OrderItem, Order
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    items = generate(db_path, args.orders, args.menu_items, args.days)
+    print(f"generated {args.orders} orders / {items} items in {time.perf_counter() - started:.1f}s")
+
+    with engine.connect() as conn:
+        orders = timed("load order columns", columnar.load_orders, conn)
+        item_columns = timed("load item columns", columnar.load_items, conn)
+    print(f"  ({len(orders['order_id'])} orders, {len(item_columns['order_id'])} items, "
+          f"{(sum(a.nbytes for a in orders.values()) + sum(a.nbytes for a in item_columns.values())) / 1e6:.0f} MB)")
+
+    timed("summary + percentiles", columnar.summary, orders)
+    timed("day x hour heatmap", columnar.heatmap, orders, 330)
+    timed("7 day moving average", columnar.moving_average, orders, 7, 330)
+    timed("top 10 items", columnar.top_items, item_columns, 10)
+    timed("basket pairs", columnar.basket, item_columns, 10)
+    timed("end-to-end summary report", columnar.run_report, "summary")
+    timed("end-to-end basket report", columnar.run_report, "basket")
+
+    exported = 0
+    started = time.perf_counter()
+    for chunk in columnar.export_csv("orders"):
+        exported += len(chunk)
+    print(f"  {'CSV export (orders)':<28} {(time.perf_counter() - started) * 1000:10.1f} ms ({exported / 1e6:.0f} MB)")
+
+    if args.orm_baseline:
+        def orm_top_items():
+            db = SessionLocal()
+            quantities = {}
+            try:
+                rows = db.query(OrderItem).join(Order).filter(Order.status != "cancelled").yield_per(10000)
+                for item in rows:
+                    quantities[item.menu_item_id] = quantities.get(item.menu_item_id, 0) + item.quantity
+            finally:
+                db.close()
+            return sorted(quantities.items(), key=lambda kv: -kv[1])[:10]
+        timed("ORM top 10 items (baseline)", orm_top_items)
+
+
+if __name__ == "__main__":
+    main()
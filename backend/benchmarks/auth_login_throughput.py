@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Login throughput, and menu read latency while logins are running.
+
+Starts the API under uvicorn against a scratch SQLite database and registers
+a user. Menu readers first run alone to get a baseline, then alongside a
+stream of concurrent logins; with bcrypt off the event loop the menu
+latency should barely move. Finally times a token-authenticated admin
+endpoint to show the token and user caches at work.
+
+    python -m benchmarks.auth_login_throughput --duration 10 --logins 16 --readers 16
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.ws_order_latency import free_port, percentile, wait_until_ready
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREDENTIALS = {"email": "bench@example.com", "password": "benchmark-password"}
+
+
+async def loop_requests(client, duration, request, latencies, errors):
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await request(client)
+            ok = response.status_code == 200
+        except httpx.TransportError:
+            ok = False
+        latencies.append((time.perf_counter() - started) * 1000)
+        if not ok:
+            errors[0] += 1
+
+
+def report(label, latencies, errors, duration):
+    if not latencies:
+        print(f"{label:<26} no requests")
+        return
+    print(f"{label:<26} {len(latencies) / duration:8.1f} req/s   p50 {percentile(latencies, 50):7.1f} ms   "
+          f"p99 {percentile(latencies, 99):7.1f} ms   errors {errors[0]}")
+
+
+async def run(args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", SECRET_KEY=secrets.token_urlsafe(32))
+
+    subprocess.run([sys.executable, "init_db.py"], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        await wait_until_ready(base_url)
+        limits = httpx.Limits(max_connections=args.logins + args.readers + 10)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            await client.post("/api/v1/auth/register", json={**CREDENTIALS, "is_admin": True})
+
+            def read_menu(client):
+                return client.get("/api/v1/menu/")
+
+            def log_in(client):
+                return client.post("/api/v1/auth/login", json=CREDENTIALS)
+
+            baseline, baseline_errors = [], [0]
+            await asyncio.gather(*(
+                loop_requests(client, args.duration, read_menu, baseline, baseline_errors)
+                for _ in range(args.readers)
+            ))
+
+            reads, read_errors = [], [0]
+            logins, login_errors = [], [0]
+            await asyncio.gather(
+                *(loop_requests(client, args.duration, read_menu, reads, read_errors) for _ in range(args.readers)),
+                *(loop_requests(client, args.duration, log_in, logins, login_errors) for _ in range(args.logins)),
+            )
+
+            token = (await log_in(client)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            def read_admin(client):
+                return client.get("/api/v1/analytics/", headers=headers)
+
+            authed, authed_errors = [], [0]
+            await asyncio.gather(*(
+                loop_requests(client, args.duration, read_admin, authed, authed_errors)
+                for _ in range(args.readers)
+            ))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{args.readers} menu readers, {args.logins} concurrent logins, {args.duration}s per phase")
+    report("menu reads (alone)", baseline, baseline_errors, args.duration)
+    report("menu reads (with logins)", reads, read_errors, args.duration)
+    report("logins", logins, login_errors, args.duration)
+    report("token-authed admin reads", authed, authed_errors, args.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Multi-process harness for the admin notification event bus.
+
+Spawns several worker processes against a scratch SQLite database. Each one
+builds an event bus for the chosen backend, publishes a batch of events and
+records everything its handler receives. With the 'database' backend every
+worker must see every event; with 'memory' each worker only sees its own.
+
+    python -m benchmarks.event_bus_harness --workers 4 --events 200
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker(backend, worker_id, events, expected, database_url, barrier, results):
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, BACKEND_DIR)
+    from app.core.database import async_engine
+    from app.core.events import create_event_bus
+
+    async def run():
+        received = []
+
+        async def handler(message, key):
+            received.append((message["data"]["worker"], message["data"]["n"], time.time()))
+
+        bus = create_event_bus(handler, backend)
+        if hasattr(bus, "poll_interval"):
+            bus.poll_interval = 0.02
+        await bus.start()
+        await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+
+        for n in range(events):
+            await bus.publish({"type": "harness", "data": {"worker": worker_id, "n": n, "sent": time.time()}})
+
+        deadline = time.monotonic() + 30
+        while len(received) < expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        await bus.stop()
+        # Pooled aiosqlite connections hold non-daemon threads that would block exit
+        await async_engine.dispose()
+        return received
+
+    received = asyncio.run(run())
+    results.put((worker_id, len(received), len(set((w, n) for w, n, _ in received))))
+
+
+def run_backend(backend, workers, events):
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bus-"), "bus.db")
+    database_url = f"sqlite:///{db_path}"
+    subprocess.run([sys.executable, "init_db.py"], cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL,
+                   env=dict(os.environ, DATABASE_URL=database_url))
+
+    expected = events * workers if backend == "database" else events
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(backend, i, events, expected, database_url, barrier, results))
+        for i in range(workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcome = sorted(results.get(timeout=120) for _ in processes)
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    ok = all(received == expected and unique == expected for _, received, unique in outcome)
+    print(f"[{backend}] {workers} workers x {events} events in {elapsed:.2f}s: "
+          f"{'OK' if ok else 'FAILED'} (expected {expected} per worker)")
+    for worker_id, received, unique in outcome:
+        print(f"  worker {worker_id}: received {received}, unique {unique}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "database", "all"], default="all")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+
+    backends = ["memory", "database"] if args.backend == "all" else [args.backend]
+    ok = all([run_backend(backend, args.workers, args.events) for backend in backends])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Menu search index latency on a synthetic multi-branch catalog.
+
+Builds the in-memory search index over N generated menu items and times
+exact, prefix (search as you type), misspelt and multi-word queries, then
+single-item updates.
+
+    python -m benchmarks.menu_search --items 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from benchmarks.scenarios import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DISHES = ["chicken", "paneer", "salmon", "lamb", "prawn", "mushroom", "chickpea", "tofu", "beef", "duck"]
+STYLES = ["tikka", "masala", "biryani", "korma", "curry", "grilled", "tandoori", "kebab", "noodles", "salad"]
+CATEGORIES = ["Appetizers", "Main Course", "Desserts", "Beverages", "Breads", "Rice", "Specials", "Sides"]
+WORDS = ["spicy", "creamy", "smoky", "fresh", "garlic", "herbs", "butter", "lemon", "ginger", "chilli"]
+
+QUERIES = {
+    "exact": ["chicken", "salmon", "biryani", "desserts"],
+    "prefix": ["chi", "tand", "mas", "bir"],
+    "typo": ["chiken", "biriyani", "tandori", "panner"],
+    "multi-word": ["chicken tikka", "grilled salmon", "paneer korma", "prawn cur"],
+}
+
+
+def synthetic_items(count, seed=11):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i + 1,
+            "name": f"{rng.choice(DISHES).title()} {rng.choice(STYLES).title()} {i % 97}",
+            "price": rng.randint(50, 1500) * 100,
+            "category": rng.choice(CATEGORIES),
+            "description": " ".join(rng.sample(WORDS, 4)),
+            "available": rng.random() > 0.1,
+            "created_at": "2024-01-01T00:00:00",
+            "updated_at": "2024-01-01T00:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    from app.core.search import MenuSearchIndex
+
+    items = synthetic_items(args.items)
+    index = MenuSearchIndex()
+    started = time.perf_counter()
+    index.load(items, index.generation)
+    print(f"indexed {args.items} items in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    for kind, queries in QUERIES.items():
+        latencies = []
+        for _ in range(args.repeat):
+            for query in queries:
+                started = time.perf_counter()
+                result = index.search(query)
+                latencies.append((time.perf_counter() - started) * 1000)
+        print(f"  {kind:<11} p50 {percentile(latencies, 50):6.3f}   p95 {percentile(latencies, 95):6.3f} ms   "
+              f"('{queries[0]}': {index.search(queries[0])['total']} hits)")
+
+    latencies = []
+    for item in items[:args.repeat]:
+        started = time.perf_counter()
+        index.upsert({**item, "name": item["name"] + " Special"})
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"  {'upsert':<11} p50 {percentile(latencies, 50):6.3f}   p95 {percentile(latencies, 95):6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
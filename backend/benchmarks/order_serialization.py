@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""GET /orders serialization: row tuples and FastJSONResponse vs ORM + Pydantic.
+
+Seeds a scratch SQLite database, mounts the previous implementation of the
+order listing (ORM instances with selectinload'ed items, validated against
+response_model=List[Order] and run through jsonable_encoder) next to the
+real endpoint, checks that both return the same JSON and times each through
+the full ASGI stack.
+
+    python -m benchmarks.order_serialization --orders 20000 --limit 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.scenarios import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def time_requests(client, path, params, requests):
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path, params=params)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return latencies
+
+
+async def run(args):
+    from typing import List
+
+    import httpx
+    from fastapi import Depends
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+
+    from app.api.v1.dependencies import get_read_db
+    from app.core.database import async_engine, async_read_engine
+    from app.core.serialization import orjson
+    from app.models import Order as OrderModel
+    from app.schemas import Order
+    from main import app
+
+    @app.get("/legacy/orders", response_model=List[Order])
+    async def legacy_orders(limit: int = 100, db=Depends(get_read_db)):
+        result = await db.execute(
+            select(OrderModel)
+            .options(selectinload(OrderModel.items))
+            .order_by(OrderModel.created_at.desc(), OrderModel.id.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    params = {"limit": args.limit}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        fast = await client.get("/api/v1/orders/", params=params)
+        legacy = await client.get("/legacy/orders", params=params)
+        if fast.json() != legacy.json():
+            sys.exit("row serialization and the ORM path returned different orders")
+        print(f"responses match: {len(fast.json())} orders, {len(fast.content) / 1024:.0f} KB "
+              f"({'orjson' if orjson else 'json'}), bytes identical: {fast.content == legacy.content}")
+
+        results = {}
+        for label, path in (("ORM + Pydantic", "/legacy/orders"), ("row tuples", "/api/v1/orders/")):
+            await time_requests(client, path, params, 3)  # warm up
+            latencies = await time_requests(client, path, params, args.requests)
+            results[label] = latencies
+            print(f"  {label:<16} mean {sum(latencies) / len(latencies):7.1f}   p50 {percentile(latencies, 50):7.1f}   "
+                  f"p95 {percentile(latencies, 95):7.1f} ms   {len(latencies) / (sum(latencies) / 1000):6.1f} req/s")
+    before, after = (sum(results[label]) for label in ("ORM + Pydantic", "row tuples"))
+    print(f"speedup: {before / after:.1f}x")
+    await async_read_engine.dispose()
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--menu-items", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="serialization-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SLOW_QUERY_MS", "0")
+    sys.path.insert(0, BACKEND_DIR)
+    from benchmarks.seed import seed_database
+
+    items = seed_database(db_path, args.menu_items, args.orders, 90)
+    print(f"seeded {args.orders} orders / {items} items; GET /orders?limit={args.limit} x {args.requests}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
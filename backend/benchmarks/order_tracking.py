@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Customer order tracking: memory per idle stream and cost of one status change.
+
+Subscribes N waiting customer streams spread over M orders on the connection
+manager, as GET /orders/{id}/events does, and reports the memory each idle
+stream holds and the time to hand one order_status_change to its watchers,
+which should not grow with the number of other streams.
+
+    python -m benchmarks.order_tracking --streams 20000 --orders 10000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.scenarios import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def run(args):
+    from app.core.websocket import ConnectionManager
+
+    manager = ConnectionManager()
+    delivered = [0]
+
+    async def watch(subscription):
+        try:
+            while True:
+                events = await subscription.next(3600)
+                delivered[0] += len(events)
+                if subscription.closed:
+                    return
+        finally:
+            manager.unsubscribe(subscription)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    subscriptions = [manager.subscribe(i % args.orders) for i in range(args.streams)]
+    tasks = [asyncio.create_task(watch(subscription)) for subscription in subscriptions]
+    await asyncio.sleep(0)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(f"{args.streams} idle streams over {args.orders} orders: {total / args.streams:.0f} bytes each "
+          f"(subscription, index entry and the waiting coroutine standing in for the response)")
+
+    latencies = []
+    for n in range(args.updates):
+        message = {"type": "order_status_change",
+                   "data": {"order_id": n % args.orders, "status": "preparing", "estimated_time": 30}}
+        started = time.perf_counter()
+        manager._notify_subscribers(message)
+        latencies.append((time.perf_counter() - started) * 1e6)
+        await asyncio.sleep(0)
+    print(f"status change fan-out: p50 {percentile(latencies, 50):.1f}   p95 {percentile(latencies, 95):.1f} us "
+          f"per update ({args.streams // args.orders} watchers per order), {delivered[0]} events delivered")
+
+    for order_id in range(args.orders):
+        manager._notify_subscribers({"type": "order_status_change",
+                                     "data": {"order_id": order_id, "status": "delivered"}})
+    await asyncio.gather(*tasks)
+    print(f"all streams closed on delivery; {len(manager.order_subscriptions)} subscriptions left")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=20_000)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--updates", type=int, default=2_000)
+    args = parser.parse_args()
+    sys.path.insert(0, BACKEND_DIR)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Replay signed payment webhooks against the API like a bursting provider.
+
+Starts the API under uvicorn against a scratch SQLite database, seeds N orders
+and builds a fixture of Stripe-signed payment_intent events for them (a
+processing event followed by succeeded or payment_failed, with a share of
+redeliveries). The fixture is fired at POST /api/v1/payments/stripe/webhook
+as fast as the concurrency allows; the harness then waits for the worker pool
+to drain the queue and checks every order ended with the expected status.
+
+    python -m benchmarks.payment_webhook_replay --orders 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.ws_order_latency import free_port, percentile, wait_until_ready
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEBHOOK_SECRET = "whsec_benchmark"
+
+
+def sign(payload, secret=WEBHOOK_SECRET, timestamp=None):
+    """Stripe-Signature header for ``payload``, as the provider computes it"""
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def build_fixture(order_ids, failure_rate, duplicate_rate, seed=7):
+    """Signed (payload, header) pairs and the payment status each order should end with"""
+    rng = random.Random(seed)
+    created = int(time.time()) - 60
+    events = []
+    expected = {}
+    for order_id in order_ids:
+        intent_id = f"pi_bench_{order_id}"
+        outcome = "payment_intent.payment_failed" if rng.random() < failure_rate else "payment_intent.succeeded"
+        expected[order_id] = "failed" if outcome == "payment_intent.payment_failed" else "paid"
+        for offset, event_type in enumerate(["payment_intent.processing", outcome]):
+            events.append({
+                "id": f"evt_bench_{order_id}_{offset}",
+                "object": "event",
+                "type": event_type,
+                "created": created + offset,
+                "data": {"object": {
+                    "id": intent_id,
+                    "object": "payment_intent",
+                    "amount": 1000,
+                    "metadata": {"order_id": str(order_id)},
+                }},
+            })
+
+    events += [rng.choice(events) for _ in range(int(len(events) * duplicate_rate))]
+    rng.shuffle(events)
+    fixture = []
+    for event in events:
+        payload = json.dumps(event)
+        fixture.append((payload, sign(payload)))
+    return fixture, expected
+
+
+def payment_statuses(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute("SELECT id, payment_status FROM orders"))
+
+
+async def run(args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+               PAYMENT_WORKERS=str(args.workers))
+
+    subprocess.run([sys.executable, "init_db.py"], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        await wait_until_ready(base_url)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            order = {"customer_name": "Benchmark", "delivery_type": "pickup",
+                     "items": [{"menu_item_id": 1, "quantity": 1}]}
+            response = await client.post("/api/v1/orders/batch", json=[order] * args.orders)
+            order_ids = [result["order_id"] for result in response.json()["results"]]
+
+            fixture, expected = build_fixture(order_ids, args.failure_rate, args.duplicate_rate)
+            latencies = []
+            statuses = {}
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def deliver(payload, header):
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post(
+                            "/api/v1/payments/stripe/webhook", content=payload,
+                            headers={"Stripe-Signature": header, "Content-Type": "application/json"},
+                        )
+                        status = response.status_code
+                    except httpx.TransportError:
+                        status = "error"
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    statuses[status] = statuses.get(status, 0) + 1
+
+            # A forged signature must be rejected before anything is queued
+            forged = await client.post("/api/v1/payments/stripe/webhook", content=fixture[0][0],
+                                       headers={"Stripe-Signature": sign(fixture[0][0], "whsec_forged")})
+
+            started = time.perf_counter()
+            await asyncio.gather(*(deliver(payload, header) for payload, header in fixture))
+            intake = time.perf_counter() - started
+
+        deadline = time.monotonic() + args.timeout
+        while True:
+            actual = payment_statuses(db_path)
+            mismatched = [order_id for order_id, status in expected.items() if actual.get(order_id) != status]
+            if not mismatched or time.monotonic() > deadline:
+                break
+            await asyncio.sleep(0.1)
+        drained = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"orders:          {args.orders} ({args.workers} workers)")
+    print(f"webhooks:        {len(fixture)} (concurrency {args.concurrency}, responses {statuses})")
+    print(f"forged rejected: {forged.status_code == 400}")
+    print(f"intake:          {len(fixture) / intake:.1f} events/s")
+    print(f"intake p50:      {percentile(latencies, 50):.1f} ms")
+    print(f"intake p99:      {percentile(latencies, 99):.1f} ms")
+    print(f"queue drained:   {drained:.2f}s after the first delivery")
+    print(f"orders correct:  {len(expected) - len(mismatched)}/{len(expected)}")
+    sys.exit(0 if not mismatched and forged.status_code == 400 else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=60)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
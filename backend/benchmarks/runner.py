@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark suite for the API, with baselines and regression checks.
+
+Seeds a scratch SQLite database at the chosen scale, starts main.app
+in-process (startup events included) and drives it through an httpx ASGI
+transport: menu browsing, order creation with mixed basket sizes, status
+updates, order listing, the kitchen board and /ws/admin fan-out to N
+sockets. Prints throughput and p50/p95/p99 latency per scenario.
+
+--save-baseline writes the results to benchmarks/baselines/<scale>.json;
+otherwise they are compared with that file and the run fails when p95
+latency rises, or throughput falls, by more than --threshold.
+
+    python -m benchmarks.runner --scale small --save-baseline
+    python -m benchmarks.runner --scale medium --scenarios menu_browse,order_list
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(BACKEND_DIR, "benchmarks", "baselines")
+
+# Requests per scenario; for ws_fanout, orders each delivered to every socket
+DEFAULT_REQUESTS = {
+    "menu_browse": 2000,
+    "order_create": 500,
+    "status_update": 400,
+    "order_list": 300,
+    "active_board": 500,
+    "ws_fanout": 100,
+}
+
+
+def compare(results, baseline, threshold):
+    """Regressions of p95 latency or throughput beyond ``threshold`` (a fraction)"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if previous["throughput"] and current["throughput"] < previous["throughput"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {previous['throughput']:.1f} -> {current['throughput']:.1f} req/s"
+            )
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+async def run_suite(args, scenario_names):
+    import httpx
+    from benchmarks.scenarios import SCENARIOS
+    from main import app
+
+    context = {
+        "menu_items": args.menu_items,
+        "basket_sizes": [1, 1, 2, 2, 3, 4, 6, 8],
+        "sockets": args.sockets,
+        "created_orders": [],
+    }
+    results = {}
+    await app.router.startup()
+    try:
+        # Unhandled app errors count as 500s instead of aborting the run
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name in scenario_names:
+                requests = args.requests or DEFAULT_REQUESTS[name]
+                recorder = await SCENARIOS[name](client, app, context, requests, args.concurrency)
+                results[name] = recorder.summary()
+                summary = results[name]
+                print(f"{name:<14} {summary['requests']:7d} req {summary['throughput']:9.1f} req/s   "
+                      f"p50 {summary['p50_ms']:7.1f}   p95 {summary['p95_ms']:7.1f}   "
+                      f"p99 {summary['p99_ms']:7.1f} ms   errors {summary['errors']}")
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", default="small", help="small, medium or large (see benchmarks.seed)")
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_REQUESTS))
+    parser.add_argument("--requests", type=int, default=None, help="Requests per scenario (default varies)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--sockets", type=int, default=50, help="Admin sockets for ws_fanout")
+    parser.add_argument("--baseline", default=None, help="Baseline file (default baselines/<scale>.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    from benchmarks.seed import SCALES
+    if args.scale not in SCALES:
+        parser.error(f"unknown scale '{args.scale}', expected one of {', '.join(SCALES)}")
+    scenario_names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenario_names if name not in DEFAULT_REQUESTS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    menu_items, orders, days = SCALES[args.scale]
+    args.menu_items = menu_items
+
+    # The app reads DATABASE_URL on import, so point it at the scratch database first
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # One in-process client plays every customer; per-client rate limits would throttle the whole suite
+    os.environ.setdefault("ADMISSION_CLIENT_RATE", "1000000")
+    # The kitchen scenarios call admin endpoints without a token
+    os.environ.setdefault("ADMIN_AUTH_REQUIRED", "false")
+    sys.path.insert(0, BACKEND_DIR)
+    from benchmarks.seed import seed_database
+
+    started = time.perf_counter()
+    items = seed_database(db_path, menu_items, orders, days)
+    print(f"seeded '{args.scale}': {menu_items} menu items, {orders} orders, {items} order items "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    results = asyncio.run(run_suite(args, scenario_names))
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{args.scale}.json")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump({
+                "scale": args.scale,
+                "concurrency": args.concurrency,
+                "sockets": args.sockets,
+                "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                            "cpus": os.cpu_count()},
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {baseline_path}")
+        return
+
+    if not os.path.exists(baseline_path):
+        print(f"no baseline at {baseline_path}; run with --save-baseline to create one")
+        return
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"REGRESSIONS (threshold {args.threshold:.0%}) against {baseline_path}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"no regressions beyond {args.threshold:.0%} against {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
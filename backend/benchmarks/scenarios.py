@@ -0,0 +1,288 @@
+"""Load scenarios driven in-process against the ASGI app.
+
+Each scenario takes an httpx client bound to the app through an ASGI
+transport, the app itself (for WebSockets, which httpx cannot carry) and a
+context describing the seeded data, and returns a Recorder of its latencies.
+"""
+import asyncio
+import json
+import random
+import time
+from typing import Callable, Dict, List
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Recorder:
+    """Latency samples (ms) and error count for one scenario"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.elapsed = 0.0
+
+    async def timed(self, request, ok_statuses=(200, 304)):
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.errors += 1
+            return None
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code not in ok_statuses:
+            self.errors += 1
+        return response
+
+    def summary(self) -> Dict:
+        count = len(self.latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "throughput": round(count / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50), 2),
+            "p95_ms": round(percentile(self.latencies, 95), 2),
+            "p99_ms": round(percentile(self.latencies, 99), 2),
+        }
+
+
+async def run_concurrently(recorder: Recorder, count: int, concurrency: int, make_request: Callable):
+    """Call ``make_request(i)`` ``count`` times with at most ``concurrency`` in flight"""
+    counter = iter(range(count))
+
+    async def worker():
+        for i in counter:
+            await make_request(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    recorder.elapsed = time.perf_counter() - started
+    return recorder
+
+
+def random_basket(rng: random.Random, context: Dict) -> Dict:
+    size = rng.choice(context["basket_sizes"])
+    return {
+        "customer_name": "Benchmark",
+        "delivery_type": rng.choice(["pickup", "delivery"]),
+        "items": [
+            {"menu_item_id": rng.randint(1, context["menu_items"]), "quantity": rng.randint(1, 3)}
+            for _ in range(size)
+        ],
+    }
+
+
+async def menu_browse(client, app, context, requests, concurrency):
+    """Customers browsing: full menu (half revalidating with ETags), categories and single items"""
+    rng = random.Random(1)
+    recorder = Recorder()
+    etag = (await client.get("/api/v1/menu/")).headers.get("etag")
+
+    async def request(i):
+        roll = rng.random()
+        if roll < 0.25:
+            await recorder.timed(client.get("/api/v1/menu/"))
+        elif roll < 0.5:
+            await recorder.timed(client.get("/api/v1/menu/", headers={"If-None-Match": etag}))
+        elif roll < 0.75:
+            category = f"Category {rng.randrange(8)}"
+            await recorder.timed(client.get("/api/v1/menu/", params={"category": category}))
+        else:
+            await recorder.timed(client.get(f"/api/v1/menu/{rng.randint(1, context['menu_items'])}"))
+
+    return await run_concurrently(recorder, requests, concurrency, request)
+
+
+async def order_create(client, app, context, requests, concurrency):
+    """Checkout with baskets of 1 to 8 lines"""
+    rng = random.Random(2)
+    recorder = Recorder()
+
+    async def request(i):
+        response = await recorder.timed(client.post("/api/v1/orders/", json=random_basket(rng, context)))
+        if response is not None and response.status_code == 200:
+            context["created_orders"].append(response.json()["id"])
+
+    return await run_concurrently(recorder, requests, concurrency, request)
+
+
+async def status_update(client, app, context, requests, concurrency):
+    """Kitchen staff walking new orders through accepted -> preparing -> ready -> delivered"""
+    rng = random.Random(3)
+    recorder = Recorder()
+    steps = ["accepted", "preparing", "ready", "delivered"]
+    needed = (requests + len(steps) - 1) // len(steps)
+    while len(context["created_orders"]) < needed:
+        response = await client.post("/api/v1/orders/", json=random_basket(rng, context))
+        context["created_orders"].append(response.json()["id"])
+    order_ids = context["created_orders"][:needed]
+    del context["created_orders"][:needed]
+
+    async def request(i):
+        order_id = order_ids[i % needed]
+        status = steps[min(i // needed, len(steps) - 1)]
+        await recorder.timed(client.put(f"/api/v1/orders/{order_id}/status", json={"status": status}),
+                             ok_statuses=(200, 409))
+
+    # Each step of the workflow is applied to every order before the next one
+    recorder.elapsed = 0.0
+    for step in range(len(steps)):
+        batch = range(step * needed, min((step + 1) * needed, requests))
+        if not batch:
+            break
+        started = time.perf_counter()
+        pending = iter(batch)
+
+        async def worker():
+            for i in pending:
+                await request(i)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        recorder.elapsed += time.perf_counter() - started
+    return recorder
+
+
+async def order_list(client, app, context, requests, concurrency):
+    """Admin order listing: first page and the page after it, by cursor"""
+    recorder = Recorder()
+
+    async def request(i):
+        response = await recorder.timed(client.get("/api/v1/orders/", params={"limit": 100}))
+        cursor = response.headers.get("x-next-cursor") if response is not None else None
+        if cursor and i % 2:
+            await recorder.timed(client.get("/api/v1/orders/", params={"limit": 100, "cursor": cursor}))
+
+    return await run_concurrently(recorder, requests, concurrency, request)
+
+
+async def active_board(client, app, context, requests, concurrency):
+    """Kitchen board polling the open orders"""
+    recorder = Recorder()
+
+    async def request(i):
+        await recorder.timed(client.get("/api/v1/orders/active"))
+
+    return await run_concurrently(recorder, requests, concurrency, request)
+
+
+class InProcessWebSocket:
+    """Minimal ASGI WebSocket client calling the app directly"""
+
+    def __init__(self, app, path: str, client_id: int, on_message: Callable[[str], None]):
+        self.app = app
+        self.path = path
+        self.client_id = client_id
+        self.on_message = on_message
+        self.accepted = asyncio.Event()
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    async def connect(self):
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": self.path,
+            "raw_path": self.path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("bench", self.client_id),
+            "server": ("bench", 80),
+            "subprotocols": [],
+        }
+        await self._incoming.put({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(scope, self._incoming.get, self._send))
+        await self.accepted.wait()
+
+    async def _send(self, message):
+        if message["type"] == "websocket.accept":
+            self.accepted.set()
+        elif message["type"] == "websocket.send":
+            self.on_message(message.get("text") or message.get("bytes", b"").decode())
+
+    async def close(self):
+        await self._incoming.put({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self._task, timeout=5)
+        except (asyncio.TimeoutError, Exception):
+            self._task.cancel()
+
+
+async def ws_fanout(client, app, context, requests, concurrency):
+    """New orders reaching N admin sockets; latency is POST start to delivery on each socket"""
+    rng = random.Random(4)
+    recorder = Recorder()
+    sockets = context["sockets"]
+    sent_at: Dict[int, float] = {}
+    # Deliveries can beat the POST response that tells us the order id
+    early: Dict[int, List[float]] = {}
+    delivered = asyncio.Event()
+    expected = [None]
+
+    def record(order_id, received_at):
+        recorder.latencies.append((received_at - sent_at[order_id]) * 1000)
+        if expected[0] is not None and len(recorder.latencies) >= expected[0]:
+            delivered.set()
+
+    def on_message(text):
+        received_at = time.perf_counter()
+        message = json.loads(text)
+        events = message["events"] if message.get("type") == "batch" else [message]
+        for event in events:
+            if event.get("type") == "new_order":
+                order_id = event["data"]["id"]
+                if order_id in sent_at:
+                    record(order_id, received_at)
+                else:
+                    early.setdefault(order_id, []).append(received_at)
+
+    connections = [InProcessWebSocket(app, "/ws/admin", i, on_message) for i in range(sockets)]
+    await asyncio.gather(*(connection.connect() for connection in connections))
+
+    async def request(i):
+        start = time.perf_counter()
+        response = await client.post("/api/v1/orders/", json=random_basket(rng, context))
+        if response.status_code != 200:
+            recorder.errors += 1
+            return
+        order_id = response.json()["id"]
+        sent_at[order_id] = start
+        for received_at in early.pop(order_id, []):
+            record(order_id, received_at)
+
+    started = time.perf_counter()
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            await request(i)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    expected[0] = len(sent_at) * sockets
+    if len(recorder.latencies) < expected[0]:
+        try:
+            await asyncio.wait_for(delivered.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            recorder.errors += expected[0] - len(recorder.latencies)
+    recorder.elapsed = time.perf_counter() - started
+
+    await asyncio.gather(*(connection.close() for connection in connections))
+    return recorder
+
+
+SCENARIOS = {
+    "menu_browse": menu_browse,
+    "order_create": order_create,
+    "status_update": status_update,
+    "order_list": order_list,
+    "active_board": active_board,
+    "ws_fanout": ws_fanout,
+}
@@ -0,0 +1,90 @@
+"""Synthetic restaurant data for benchmarks.
+
+Generates a menu and an order history of any size straight into a SQLite
+database, with analytics rollups to match, so that scenarios can be run at
+several data sizes and their scaling compared.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# (menu items, historical orders, days of history)
+SCALES = {
+    "small": (50, 2_000, 30),
+    "medium": (200, 50_000, 180),
+    "large": (500, 500_000, 365),
+}
+
+STATUSES = ["delivered", "cancelled", "pending", "accepted", "preparing", "ready"]
+STATUS_WEIGHTS = [0.88, 0.07, 0.02, 0.01, 0.01, 0.01]
+CATEGORIES = 8
+
+
+def generate(db_path, orders, menu_items, days, seed=7):
+    """Insert ``menu_items`` dishes and ``orders`` orders (~2.5 items each); returns the item count"""
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    offsets = np.sort(rng.integers(0, days * 86400, orders))[::-1]
+    created = [(now - timedelta(seconds=int(o))).strftime("%Y-%m-%d %H:%M:%S") for o in offsets]
+    prices = rng.integers(50, 1500, menu_items) * 100
+    basket_sizes = rng.integers(1, 5, orders)
+    item_order = np.repeat(np.arange(1, orders + 1), basket_sizes)
+    item_menu = rng.zipf(1.3, len(item_order)) % menu_items + 1
+    item_quantity = rng.integers(1, 4, len(item_order))
+    item_price = prices[item_menu - 1]
+    totals = np.bincount(item_order, weights=item_price * item_quantity, minlength=orders + 1)[1:].astype(np.int64)
+    statuses = rng.choice(STATUSES, orders, p=STATUS_WEIGHTS)
+    delivery = rng.choice(["pickup", "delivery"], orders)
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO menu_items (id, name, price, category, available) VALUES (?, ?, ?, ?, 1)",
+        [(i + 1, f"Dish {i + 1}", int(prices[i]), f"Category {i % CATEGORIES}") for i in range(menu_items)],
+    )
+    conn.executemany(
+        "INSERT INTO orders (id, customer_name, delivery_type, status, total_amount, created_at, updated_at) "
+        "VALUES (?, 'Guest', ?, ?, ?, ?, ?)",
+        ((i + 1, delivery[i], statuses[i], int(totals[i]), created[i], created[i]) for i in range(orders)),
+    )
+    conn.executemany(
+        "INSERT INTO order_items (order_id, menu_item_id, name, price, quantity) VALUES (?, ?, 'Dish', ?, ?)",
+        zip(item_order.tolist(), item_menu.tolist(), item_price.tolist(), item_quantity.tolist()),
+    )
+    conn.commit()
+    conn.close()
+    return len(item_order)
+
+
+def seed_database(db_path, menu_items, orders, days, seed=7):
+    """Create the schema in a fresh SQLite file, fill it and build the rollups.
+
+    Imports the app, so DATABASE_URL should already point at ``db_path``.
+    """
+    from sqlalchemy import create_engine, select
+    from app.core.database import Base
+    from app.crud.rollups import rollup_deltas, rollup_statements
+    from app.models import MenuItem, Order, OrderItem
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    items = generate(db_path, orders, menu_items, days, seed)
+
+    with engine.begin() as conn:
+        categories = dict(conn.execute(select(MenuItem.id, MenuItem.category)).all())
+        lines = {}
+        for order_id, menu_item_id, price, quantity in conn.execute(
+            select(OrderItem.order_id, OrderItem.menu_item_id, OrderItem.price, OrderItem.quantity)
+        ):
+            lines.setdefault(order_id, []).append((menu_item_id, price, quantity, None))
+        entries = [
+            (created_at, delivery_type, total_amount, lines.get(order_id, []))
+            for order_id, created_at, delivery_type, total_amount in conn.execute(
+                select(Order.id, Order.created_at, Order.delivery_type, Order.total_amount)
+                .filter(Order.status != "cancelled")
+            )
+        ]
+        for stmt, rows in rollup_statements("sqlite", *rollup_deltas(entries, categories)):
+            conn.execute(stmt, rows)
+    engine.dispose()
+    return items
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Order creation latency while many admin sockets are connected.
+
+Starts the API under uvicorn against a scratch SQLite database, attaches N
+admin WebSockets to /ws/admin and fires concurrent POST /api/v1/orders/
+requests, then reports latency percentiles.
+
+    python -m benchmarks.ws_order_latency --sockets 200 --orders 1000
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import websockets
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(base_url, timeout=20):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{base_url}/api/v1/menu/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("API server did not start")
+
+
+async def hold_admin_socket(ws_url, ready, stop, received):
+    async with websockets.connect(ws_url, max_queue=None) as ws:
+        ready.release()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(ws.recv(), timeout=0.5)
+                received[0] += 1
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run(args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+
+    subprocess.run([sys.executable, "init_db.py"], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        await wait_until_ready(base_url)
+
+        ready = asyncio.Semaphore(0)
+        stop = asyncio.Event()
+        received = [0]
+        sockets = [
+            asyncio.create_task(hold_admin_socket(f"ws://127.0.0.1:{port}/ws/admin", ready, stop, received))
+            for _ in range(args.sockets)
+        ]
+        for _ in range(args.sockets):
+            await ready.acquire()
+
+        order = {
+            "customer_name": "Benchmark",
+            "delivery_type": "pickup",
+            "items": [{"menu_item_id": 1, "quantity": 2}, {"menu_item_id": 4, "quantity": 1}],
+        }
+        latencies = []
+        errors = 0
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            async def place_order():
+                nonlocal errors
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post("/api/v1/orders/", json=order)
+                    except httpx.TransportError:
+                        errors += 1
+                        return
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        errors += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(place_order() for _ in range(args.orders)))
+            elapsed = time.perf_counter() - started
+
+        stop.set()
+        await asyncio.gather(*sockets, return_exceptions=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"admin sockets:   {args.sockets}")
+    print(f"orders:          {args.orders} (concurrency {args.concurrency}, errors {errors})")
+    print(f"throughput:      {args.orders / elapsed:.1f} orders/s")
+    print(f"latency p50:     {percentile(latencies, 50):.1f} ms")
+    print(f"latency p95:     {percentile(latencies, 95):.1f} ms")
+    print(f"latency p99:     {percentile(latencies, 99):.1f} ms")
+    print(f"admin messages:  {received[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
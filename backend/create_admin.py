@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import argparse
+import getpass
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.branches import BRANCHES
+from app.core.database import databases
+from app.core.security import pwd_context
+from app.models import User
+
+def create_admin(branch: str, email: str, password: str, full_name: str = None):
+    """Create an admin account in a branch, or make an existing account an admin"""
+    database = databases.instance(branch)
+    print(f"Connecting to database of branch '{branch}': {database.url}")
+
+    db = database.SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            db.add(User(email=email, hashed_password=pwd_context.hash(password), full_name=full_name,
+                        is_active=True, is_admin=True))
+            print(f"Created admin {email}")
+        else:
+            user.is_admin = True
+            user.is_active = True
+            user.hashed_password = pwd_context.hash(password)
+            print(f"Made existing user {email} an admin and reset the password")
+        db.commit()
+
+    except Exception as e:
+        print(f"Error creating admin: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the admin account of a branch")
+    parser.add_argument("email")
+    parser.add_argument("--full-name")
+    parser.add_argument("--branch", choices=BRANCHES, action="append",
+                        help="branch to create the admin in (repeatable); all configured branches by default")
+    args = parser.parse_args()
+
+    # Read from the environment for scripted setups, else prompt; never from the command line
+    password = os.environ.get("ADMIN_PASSWORD") or getpass.getpass("Password: ")
+    if len(password) < 8:
+        print("Password must be at least 8 characters")
+        sys.exit(1)
+
+    if all([create_admin(branch, args.email, password, args.full_name) for branch in args.branch or BRANCHES]):
+        print("Admin setup completed successfully!")
+    else:
+        print("Admin setup failed!")
+        sys.exit(1)
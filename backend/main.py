@@ -1,7 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.api import api_router
-from app.core.websocket import router as websocket_router
+from app.api.v1.endpoints.menu import connect_menu_caches
+from app.api.v1.endpoints.orders import connect_active_orders, load_active_orders
+from app.core.branches import BRANCHES, BranchMiddleware, use_branch
+from app.core.database import databases, dispose_engines
+from app.core.metrics import MetricsMiddleware, instrument_engine, router as metrics_router
+from app.core.outbox import dispatcher
+from app.core.payments import processor
+from app.core.websocket import manager, router as websocket_router
 
 app = FastAPI(
     title="Restaurant Management API",
@@ -11,6 +18,10 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Every request works on one branch, named by the X-Branch-ID header or ?branch=;
+# added before CORS so that unknown branch errors still get CORS headers
+app.add_middleware(BranchMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -20,8 +31,41 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Per-route latency and SQL timings, served at /metrics; added last so it also times CORS handling
+app.add_middleware(MetricsMiddleware)
+for database in map(databases.instance, BRANCHES):
+    if not database.owns_engines:
+        continue  # Schema branches run on the default branch's instrumented engines
+    instrument_engine(database.engine)
+    instrument_engine(database.async_engine.sync_engine)
+    instrument_engine(database.read_engine)
+    instrument_engine(database.async_read_engine.sync_engine)
+
 app.include_router(api_router, prefix="/api/v1")
 app.include_router(websocket_router)
+app.include_router(metrics_router)
+
+@app.on_event("startup")
+async def startup():
+    # Background tasks inherit the branch they were started in
+    for branch in BRANCHES:
+        with use_branch(branch):
+            connect_active_orders()
+            connect_menu_caches()
+            await load_active_orders()
+            await manager.start()
+            await dispatcher.start()
+            await processor.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    for branch in BRANCHES:
+        with use_branch(branch):
+            await processor.stop()
+            await dispatcher.stop()
+            await manager.stop()
+    # Close pooled connections while the event loop is still running
+    await dispose_engines()
 
 if __name__ == "__main__":
     import uvicorn
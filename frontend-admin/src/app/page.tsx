@@ -30,7 +30,7 @@ export default function Home() {
   // WebSocket connection for real-time notifications
   useEffect(() => {
     const connectWebSocket = () => {
-      const ws = new WebSocket('ws://localhost:8000/api/v1/ws/admin');
+      const ws = new WebSocket('ws://localhost:8000/ws/admin');
 
       ws.onopen = () => {
         console.log('Connected to admin WebSocket');